@@ -1,15 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDate, TruncMonth
+from django.core.paginator import Paginator
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
 
+from accounts.exports import export_response
+from accounts.forms import StatisticsFilterForm
 from accounts.models import User, Role
 from products.models import Product, Category
-from orders.models import Order, OrderItem, PaymentMethod
+from orders import reports
+from orders.models import Order, PaymentMethod, SalesRollup
+from orders.services import change_order_status
 from cart.models import Coupon
+from notifications.broadcast import start_broadcast
+from notifications.dispatch import notify
+from notifications.forms import BroadcastForm
+from notifications.models import Broadcast
+
+ADMIN_PAGE_SIZE = 50
 
 
 def admin_required(view_func):
@@ -25,52 +35,44 @@ def admin_required(view_func):
 
 @admin_required
 def admin_dashboard_view(request):
-    """Dashboard admin"""
-    today = timezone.now().date()
+    """Dashboard admin (số liệu đơn hàng đọc từ bảng tổng hợp, xem orders/rollups.py)"""
+    today = timezone.localdate()
     thirty_days_ago = today - timedelta(days=30)
     
     # Statistics
     total_users = User.objects.count()
     total_products = Product.objects.filter(is_active=True).count()
-    total_orders = Order.objects.count()
     
-    # Revenue
-    total_revenue = Order.objects.filter(
-        status='completed'
-    ).aggregate(total=Sum('total'))['total'] or 0
+    # Order status distribution / revenue (dòng tháng: vài dòng mỗi tháng)
+    status_rows = SalesRollup.objects.filter(period='month').values('status').annotate(
+        count=Sum('order_count'), revenue=Sum('revenue')
+    ).order_by()
+    order_status_counts = {row['status']: row['count'] for row in status_rows}
+    total_orders = sum(order_status_counts.values())
+    total_revenue = sum(row['revenue'] for row in status_rows if row['status'] == 'completed')
     
     # Today's stats
-    today_orders = Order.objects.filter(created_at__date=today).count()
-    today_revenue = Order.objects.filter(
-        created_at__date=today, 
-        status='completed'
-    ).aggregate(total=Sum('total'))['total'] or 0
+    today_rows = SalesRollup.objects.filter(period='day', date=today)
+    today_orders = today_rows.aggregate(total=Sum('order_count'))['total'] or 0
+    today_revenue = today_rows.filter(status='completed').aggregate(total=Sum('revenue'))['total'] or 0
     
     # Pending orders
-    pending_orders = Order.objects.filter(status='pending').count()
+    pending_orders = order_status_counts.get('pending', 0)
     
     # Revenue chart data (last 30 days)
-    daily_revenue = Order.objects.filter(
+    daily_revenue = SalesRollup.objects.filter(
+        period='day',
         status='completed',
-        created_at__date__gte=thirty_days_ago
-    ).annotate(
-        date=TruncDate('created_at')
-    ).values('date').annotate(
-        revenue=Sum('total')
-    ).order_by('date')
+        date__gte=thirty_days_ago
+    ).values('date', 'revenue').order_by('date')
     
     # Best selling products
     best_sellers = Product.objects.filter(
         is_active=True
     ).order_by('-sold_count')[:5]
     
-    # Order status distribution
-    order_status_counts = Order.objects.values('status').annotate(
-        count=Count('id')
-    )
-    
     # Recent orders
-    recent_orders = Order.objects.order_by('-created_at')[:10]
+    recent_orders = Order.objects.for_listing().order_by('-created_at')[:10]
     
     context = {
         'total_users': total_users,
@@ -82,17 +84,14 @@ def admin_dashboard_view(request):
         'pending_orders': pending_orders,
         'daily_revenue': list(daily_revenue),
         'best_sellers': best_sellers,
-        'order_status_counts': {item['status']: item['count'] for item in order_status_counts},
+        'order_status_counts': order_status_counts,
         'recent_orders': recent_orders,
     }
     return render(request, 'admin_panel/dashboard.html', context)
 
 
-@admin_required
-def admin_users_view(request):
-    """Quản lý người dùng"""
-    users = User.objects.all().order_by('-created_at')
-    roles = Role.objects.all()
+def filter_users(request):
+    users = User.objects.select_related('role').order_by('-created_at')
     
     # Filter
     role_filter = request.GET.get('role')
@@ -102,14 +101,39 @@ def admin_users_view(request):
     search = request.GET.get('search')
     if search:
         users = users.filter(username__icontains=search)
+    return users
+
+
+@admin_required
+def admin_users_view(request):
+    """Quản lý người dùng"""
+    page_obj = Paginator(filter_users(request), ADMIN_PAGE_SIZE).get_page(request.GET.get('page'))
+    roles = Role.objects.all()
     
     context = {
-        'users': users,
+        'users': page_obj,
+        'page_obj': page_obj,
         'roles': roles,
     }
     return render(request, 'admin_panel/users.html', context)
 
 
+@admin_required
+def admin_users_export_view(request):
+    """Xuất danh sách người dùng (?format=csv|xlsx)"""
+    columns = [
+        ('ID', 'id', None),
+        ('Tên đăng nhập', 'username', None),
+        ('Email', 'email', None),
+        ('Số điện thoại', 'phone', None),
+        ('Vai trò', 'role__name', None),
+        ('Hoạt động', 'is_active', None),
+        ('Bị khóa', 'is_locked', None),
+        ('Ngày tạo', 'created_at', None),
+    ]
+    return export_response(filter_users(request), columns, 'users', request.GET.get('format'))
+
+
 @admin_required
 def toggle_user_lock_view(request, user_id):
     """Khóa/mở khóa user"""
@@ -137,11 +161,8 @@ def change_user_role_view(request, user_id):
     return redirect('admin_users')
 
 
-@admin_required
-def admin_products_view(request):
-    """Quản lý sản phẩm"""
-    products = Product.objects.all().order_by('-created_at')
-    categories = Category.objects.all()
+def filter_products(request):
+    products = Product.objects.select_related('category').order_by('-created_at')
     
     # Filter
     category_filter = request.GET.get('category')
@@ -151,14 +172,40 @@ def admin_products_view(request):
     search = request.GET.get('search')
     if search:
         products = products.filter(name__icontains=search)
+    return products
+
+
+@admin_required
+def admin_products_view(request):
+    """Quản lý sản phẩm"""
+    page_obj = Paginator(filter_products(request), ADMIN_PAGE_SIZE).get_page(request.GET.get('page'))
+    categories = Category.objects.all()
     
     context = {
-        'products': products,
+        'products': page_obj,
+        'page_obj': page_obj,
         'categories': categories,
     }
     return render(request, 'admin_panel/products.html', context)
 
 
+@admin_required
+def admin_products_export_view(request):
+    """Xuất danh sách sản phẩm (?format=csv|xlsx)"""
+    columns = [
+        ('ID', 'id', None),
+        ('Tên sản phẩm', 'name', None),
+        ('Danh mục', 'category__name', None),
+        ('Giá', 'price', None),
+        ('Giá khuyến mãi', 'sale_price', None),
+        ('Tồn kho', 'stock', None),
+        ('Đã bán', 'sold_count', None),
+        ('Đang bán', 'is_active', None),
+        ('Ngày tạo', 'created_at', None),
+    ]
+    return export_response(filter_products(request), columns, 'products', request.GET.get('format'))
+
+
 @admin_required
 def admin_product_create_view(request):
     """Thêm sản phẩm mới"""
@@ -205,27 +252,60 @@ def admin_product_delete_view(request, product_id):
     return redirect('admin_products')
 
 
-@admin_required
-def admin_orders_view(request):
-    """Quản lý đơn hàng"""
-    orders = Order.objects.all().order_by('-created_at')
+def filter_orders(request):
+    orders = Order.objects.order_by('-created_at')
     
     # Filter by status
     status_filter = request.GET.get('status')
     if status_filter:
         orders = orders.filter(status=status_filter)
+    return orders
+
+
+@admin_required
+def admin_orders_view(request):
+    """Quản lý đơn hàng"""
+    orders = filter_orders(request)
+    paginator = Paginator(orders.for_listing().with_items(), ADMIN_PAGE_SIZE)
+    # Đếm trên queryset gốc, không kèm JOIN/GROUP BY của số lượng sản phẩm
+    paginator.count = orders.count()
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'orders': orders,
+        'orders': page_obj,
+        'page_obj': page_obj,
         'status_choices': Order.STATUS_CHOICES,
     }
     return render(request, 'admin_panel/orders.html', context)
 
 
+@admin_required
+def admin_orders_export_view(request):
+    """Xuất danh sách đơn hàng (?format=csv|xlsx)"""
+    status_display = dict(Order.STATUS_CHOICES)
+    columns = [
+        ('Mã đơn', 'id', None),
+        ('Ngày tạo', 'created_at', None),
+        ('Tài khoản', 'user__username', None),
+        ('Họ tên', 'full_name', None),
+        ('Số điện thoại', 'phone', None),
+        ('Email', 'email', None),
+        ('Địa chỉ', 'address', None),
+        ('Thanh toán', 'payment_method__name', None),
+        ('Đã thanh toán', 'is_paid', None),
+        ('Trạng thái', 'status', status_display.get),
+        ('Tạm tính', 'subtotal', None),
+        ('Phí vận chuyển', 'shipping_fee', None),
+        ('Giảm giá', 'discount', None),
+        ('Tổng tiền', 'total', None),
+    ]
+    return export_response(filter_orders(request), columns, 'orders', request.GET.get('format'))
+
+
 @admin_required
 def admin_order_detail_view(request, order_id):
     """Chi tiết đơn hàng"""
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(Order.objects.for_detail(), id=order_id)
     return render(request, 'admin_panel/order_detail.html', {'order': order})
 
 
@@ -237,14 +317,14 @@ def update_order_status_view(request, order_id):
         new_status = request.POST.get('status')
         
         if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
+            if not change_order_status(order, new_status):
+                messages.error(request, 'Đơn hàng vừa được cập nhật bởi người khác, vui lòng thử lại!')
+                return redirect('admin_order_detail', order_id=order_id)
             
             # Create notification for user
-            from notifications.models import Notification
             status_display = dict(Order.STATUS_CHOICES)[new_status]
-            Notification.objects.create(
-                user=order.user,
+            notify(
+                order.user_id,
                 title='Cập nhật đơn hàng',
                 message=f'Đơn hàng #{order.id} đã chuyển sang trạng thái: {status_display}',
                 notification_type='order',
@@ -258,57 +338,46 @@ def update_order_status_view(request, order_id):
 
 @admin_required
 def admin_statistics_view(request):
-    """Thống kê - Báo cáo"""
-    today = timezone.now().date()
+    """Thống kê - Báo cáo (theo khoảng ngày, xem orders/reports.py)"""
+    today = timezone.localdate()
     
-    # Date range
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    if not start_date:
-        start_date = today - timedelta(days=30)
-    if not end_date:
-        end_date = today
-    
-    # Revenue by month
-    monthly_revenue = Order.objects.filter(
-        status='completed'
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        revenue=Sum('total'),
-        order_count=Count('id')
-    ).order_by('month')
-    
-    # Top products
-    top_products = OrderItem.objects.filter(
-        order__status='completed'
-    ).values(
-        'product__name'
-    ).annotate(
-        total_sold=Sum('quantity'),
-        total_revenue=Sum('price')
-    ).order_by('-total_sold')[:10]
+    form = StatisticsFilterForm(request.GET or None)
+    if form.is_bound and form.is_valid():
+        filters = form.cleaned_data
+    else:
+        # Bộ lọc không hợp lệ: báo lỗi và hiển thị khoảng mặc định
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        filters = StatisticsFilterForm.defaults(today)
     
-    # Orders by status
-    orders_by_status = Order.objects.values('status').annotate(count=Count('id'))
+    # Date range
+    start_date = filters['start_date']
+    end_date = filters['end_date']
+    granularity = filters['granularity']
+    compare_previous = filters['compare']
     
-    # Revenue by category
-    revenue_by_category = OrderItem.objects.filter(
-        order__status='completed'
-    ).values(
-        'product__category__name'
-    ).annotate(
-        total=Sum('price')
-    ).order_by('-total')
+    report = reports.build_report(start_date, end_date, granularity, compare_previous)
     
     context = {
-        'monthly_revenue': list(monthly_revenue),
-        'top_products': list(top_products),
-        'orders_by_status': list(orders_by_status),
-        'revenue_by_category': list(revenue_by_category),
+        'form': form,
+        'monthly_revenue': [
+            {'month': row['period'], 'revenue': row['revenue'], 'order_count': row['order_count']}
+            for row in reports.revenue_series(start_date, end_date, 'month')
+        ],
+        'revenue_series': report['series'],
+        'summary': report['summary'],
+        'previous_series': report.get('previous_series'),
+        'previous_summary': report.get('previous_summary'),
+        'previous_start': report.get('previous_start'),
+        'previous_end': report.get('previous_end'),
+        'changes': report.get('changes'),
+        'top_products': report['top_products'],
+        'orders_by_status': report['orders_by_status'],
+        'revenue_by_category': report['revenue_by_category'],
         'start_date': start_date,
         'end_date': end_date,
+        'granularity': granularity,
     }
     return render(request, 'admin_panel/statistics.html', context)
 
@@ -317,4 +386,20 @@ def admin_statistics_view(request):
 def admin_coupons_view(request):
     """Quản lý mã giảm giá"""
     coupons = Coupon.objects.all().order_by('-created_at')
-    return render(request, 'admin_panel/coupons.html', {'coupons': coupons})
\ No newline at end of file
+    return render(request, 'admin_panel/coupons.html', {'coupons': coupons})
+
+
+@admin_required
+def admin_broadcasts_view(request):
+    """Gửi thông báo khuyến mãi cho toàn bộ người dùng (xem notifications/broadcast.py)"""
+    if request.method == 'POST':
+        form = BroadcastForm(request.POST)
+        if form.is_valid():
+            start_broadcast(created_by=request.user, **form.cleaned_data)
+            messages.success(request, 'Đã bắt đầu gửi thông báo!')
+            return redirect('admin_broadcasts')
+    else:
+        form = BroadcastForm(initial={'notification_type': 'promo'})
+    
+    broadcasts = Broadcast.objects.select_related('created_by')[:20]
+    return render(request, 'admin_panel/broadcasts.html', {'form': form, 'broadcasts': broadcasts})
@@ -0,0 +1,185 @@
+"""
+Xuất dữ liệu admin ra CSV/XLSX dạng streaming.
+
+Dữ liệu được đọc bằng values_list().iterator(chunk_size=...) (server-side cursor trên
+PostgreSQL) và ghi ra StreamingHttpResponse theo từng lô, nên bộ nhớ không phụ thuộc
+số dòng. XLSX được ghi trực tiếp (SpreadsheetML tối giản trong file zip, chuỗi inline)
+để không cần giữ cả workbook trong bộ nhớ.
+"""
+import csv
+import re
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+# Ký tự điều khiển không hợp lệ trong XML 1.0 (làm hỏng file XLSX)
+XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# Chuỗi bắt đầu bằng các ký tự này bị Excel hiểu là công thức
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class _Buffer:
+    """File giả: giữ phần vừa ghi để generator trả ra rồi xóa"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Có' if value else 'Không'
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def _csv_text(value):
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(FORMULA_PREFIXES):
+        # Dữ liệu người dùng nhập (tên, địa chỉ...) không được chạy như công thức khi mở CSV
+        return "'" + text
+    return text
+
+
+class _TextWriter:
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def write(self, text):
+        return self.buffer.write(text.encode('utf-8'))
+
+
+def stream_csv(header, rows):
+    buffer = _Buffer()
+    writer = csv.writer(_TextWriter(buffer))
+    # BOM để Excel nhận đúng UTF-8 (tiếng Việt)
+    buffer.write('\ufeff'.encode('utf-8'))
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_csv_text(value) for value in row])
+        if i % CHUNK_SIZE == 0:
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    # Ô inlineStr không bao giờ được tính như công thức nên ghi nguyên chuỗi
+    text = XML_ILLEGAL_CHARS.sub('', _text(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(header, rows, sheet_name='Sheet1'):
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(name=escape(sheet_name)))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _xlsx_row(header)
+            ).encode('utf-8'))
+            for i, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if i % CHUNK_SIZE == 0:
+                    yield buffer.pop()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.pop()
+
+
+def export_response(queryset, columns, filename, fmt='csv'):
+    """
+    columns: danh sách (tiêu đề, field cho values_list, hàm chuyển đổi hoặc None).
+    fmt: 'csv' hoặc 'xlsx'.
+    """
+    header = [title for title, _, _ in columns]
+    converters = [convert for _, _, convert in columns]
+    values = queryset.values_list(*[field for _, field, _ in columns]).iterator(chunk_size=CHUNK_SIZE)
+    rows = (
+        [convert(value) if convert else value for convert, value in zip(converters, row)]
+        for row in values
+    )
+    if fmt == 'xlsx':
+        content = stream_xlsx(header, rows, sheet_name=filename)
+    else:
+        fmt = 'csv'
+        content = stream_csv(header, rows)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{filename}_{stamp}.{fmt}"'
+    return response
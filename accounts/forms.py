@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.utils import timezone
+from orders.reports import GRANULARITY_CHOICES, MAX_HOURLY_DAYS
 from .models import User
 
 
@@ -100,4 +104,49 @@ class ResetPasswordForm(forms.Form):
         confirm = cleaned_data.get('confirm_password')
         if password and confirm and password != confirm:
             raise forms.ValidationError('Mật khẩu không khớp!')
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class StatisticsFilterForm(forms.Form):
+    """Bộ lọc trang thống kê admin"""
+    start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        'class': 'form-control',
+        'type': 'date'
+    }))
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        'class': 'form-control',
+        'type': 'date'
+    }))
+    granularity = forms.ChoiceField(choices=GRANULARITY_CHOICES, required=False, widget=forms.Select(attrs={
+        'class': 'form-select'
+    }))
+    compare = forms.BooleanField(required=False, initial=True, widget=forms.CheckboxInput(attrs={
+        'class': 'form-check-input'
+    }))
+    
+    DEFAULT_DAYS = 30
+    
+    @classmethod
+    def defaults(cls, end_date=None):
+        """Bộ lọc mặc định: DEFAULT_DAYS ngày gần nhất, theo ngày, có so sánh kỳ trước"""
+        end_date = end_date or timezone.localdate()
+        return {
+            'start_date': end_date - timedelta(days=cls.DEFAULT_DAYS),
+            'end_date': end_date,
+            'granularity': 'day',
+            'compare': True,
+        }
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        # Điền ngày mặc định trước khi kiểm tra, để giới hạn theo giờ luôn được áp dụng
+        defaults = self.defaults(cleaned_data.get('end_date'))
+        start_date = cleaned_data.get('start_date') or defaults['start_date']
+        end_date = defaults['end_date']
+        granularity = cleaned_data.get('granularity') or defaults['granularity']
+        if start_date > end_date:
+            raise forms.ValidationError('Ngày bắt đầu phải trước ngày kết thúc!')
+        if granularity == 'hour' and (end_date - start_date).days >= MAX_HOURLY_DAYS:
+            raise forms.ValidationError(f'Thống kê theo giờ tối đa {MAX_HOURLY_DAYS} ngày!')
+        cleaned_data.update(start_date=start_date, end_date=end_date, granularity=granularity)
+        return cleaned_data
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.sessions.backends.cache import KEY_PREFIX
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired rows from django_session in batches (and move live sessions to the cache)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--copy-to-cache', action='store_true',
+            help='Copy live sessions into the session cache before switching SESSION_STORE to "cache"',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Delete every row (after switching SESSION_STORE to "cache")',
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        
+        if options['copy_to_cache']:
+            cache = caches[settings.SESSION_CACHE_ALIAS]
+            copied = 0
+            for session in Session.objects.filter(expire_date__gt=now).iterator(chunk_size=batch_size):
+                timeout = int((session.expire_date - now).total_seconds())
+                cache.set(KEY_PREFIX + session.session_key, session.get_decoded(), timeout)
+                copied += 1
+            self.stdout.write(f'Copied {copied} live sessions to the cache')
+        
+        sessions = Session.objects.all() if options['all'] else Session.objects.filter(expire_date__lte=now)
+        deleted = 0
+        while True:
+            # Xóa theo lô để không khóa bảng lâu
+            keys = list(sessions.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sessions'))
@@ -0,0 +1,33 @@
+"""
+Giới hạn số truy vấn của trang đơn hàng trong admin (xem orders/tests.py).
+"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from orders.tests import TEST_SETTINGS, create_orders, render_orders
+from .models import User
+
+
+@override_settings(**TEST_SETTINGS)
+@mock.patch('accounts.admin_views.render', render_orders)
+class AdminOrderQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.orders = create_orders(customer)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_admin_orders_list(self):
+        # session, user, COUNT cho phân trang, đơn hàng, dòng đơn + sản phẩm + danh mục
+        with self.assertNumQueries(5):
+            response = self.client.get('/user/admin-panel/orders/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_order_detail(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/user/admin-panel/orders/{self.orders[0].id}/')
+        self.assertEqual(response.status_code, 200)
@@ -16,15 +16,19 @@ urlpatterns = [
     # Admin URLs
     path('admin-panel/', admin_views.admin_dashboard_view, name='admin_dashboard'),
     path('admin-panel/users/', admin_views.admin_users_view, name='admin_users'),
+    path('admin-panel/users/export/', admin_views.admin_users_export_view, name='admin_users_export'),
     path('admin-panel/users/toggle-lock/<int:user_id>/', admin_views.toggle_user_lock_view, name='toggle_user_lock'),
     path('admin-panel/users/change-role/<int:user_id>/', admin_views.change_user_role_view, name='change_user_role'),
     path('admin-panel/products/', admin_views.admin_products_view, name='admin_products'),
+    path('admin-panel/products/export/', admin_views.admin_products_export_view, name='admin_products_export'),
     path('admin-panel/products/add/', admin_views.admin_product_create_view, name='admin_product_create'),
     path('admin-panel/products/edit/<int:product_id>/', admin_views.admin_product_edit_view, name='admin_product_edit'),
     path('admin-panel/products/delete/<int:product_id>/', admin_views.admin_product_delete_view, name='admin_product_delete'),
     path('admin-panel/orders/', admin_views.admin_orders_view, name='admin_orders'),
+    path('admin-panel/orders/export/', admin_views.admin_orders_export_view, name='admin_orders_export'),
     path('admin-panel/orders/<int:order_id>/', admin_views.admin_order_detail_view, name='admin_order_detail'),
     path('admin-panel/orders/<int:order_id>/update-status/', admin_views.update_order_status_view, name='update_order_status'),
     path('admin-panel/statistics/', admin_views.admin_statistics_view, name='admin_statistics'),
     path('admin-panel/coupons/', admin_views.admin_coupons_view, name='admin_coupons'),
+    path('admin-panel/broadcasts/', admin_views.admin_broadcasts_view, name='admin_broadcasts'),
 ]
\ No newline at end of file
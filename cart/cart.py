@@ -3,68 +3,95 @@ from django.conf import settings
 from products.models import Product
 
 
+def get_cached_products(request, product_ids):
+    """
+    Lấy sản phẩm theo id với cache trong phạm vi một request:
+    nhiều Cart trong cùng request (context processor, view) chỉ tốn một truy vấn.
+    """
+    cache = getattr(request, '_cart_product_cache', None)
+    if cache is None:
+        cache = request._cart_product_cache = {}
+    missing = [pid for pid in product_ids if pid not in cache]
+    if missing:
+        for product in Product.objects.filter(id__in=missing).select_related('category'):
+            cache[product.id] = product
+        for pid in missing:
+            cache.setdefault(pid, None)
+    return {pid: cache[pid] for pid in product_ids if cache[pid] is not None}
+
+
 class Cart:
-    """Session-based shopping cart"""
-    
+    """
+    Session-based shopping cart.
+
+    Session lưu dạng gọn {product_id: [quantity, price]} (price là số nguyên VNĐ)
+    và chỉ được ghi lại khi giỏ hàng thay đổi.
+    """
+
     def __init__(self, request):
+        self.request = request
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
-    
+        self.cart = self._load(self.session.get(settings.CART_SESSION_ID) or {})
+
+    @staticmethod
+    def _load(data):
+        cart = {}
+        for product_id, value in data.items():
+            if isinstance(value, dict):
+                # Định dạng cũ: {'quantity': ..., 'price': '...'}
+                value = [value['quantity'], value['price']]
+            quantity, price = value
+            cart[int(product_id)] = [int(quantity), int(Decimal(price))]
+        return cart
+
     def add(self, product, quantity=1, override_quantity=False):
         """Thêm sản phẩm vào giỏ hàng"""
-        product_id = str(product.id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': str(product.final_price)
-            }
-        
+        item = self.cart.setdefault(product.id, [0, int(product.final_price)])
         if override_quantity:
-            self.cart[product_id]['quantity'] = quantity
+            item[0] = quantity
         else:
-            self.cart[product_id]['quantity'] += quantity
-        
+            item[0] += quantity
         self.save()
-    
+
     def remove(self, product):
         """Xóa sản phẩm khỏi giỏ hàng"""
-        product_id = str(product.id)
-        if product_id in self.cart:
-            del self.cart[product_id]
+        if product.id in self.cart:
+            del self.cart[product.id]
             self.save()
-    
+
     def save(self):
-        self.session.modified = True
-    
+        self.session[settings.CART_SESSION_ID] = {
+            str(product_id): item for product_id, item in self.cart.items()
+        }
+
     def __iter__(self):
         """Iterate over cart items"""
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        
-        for product in products:
-            cart[str(product.id)]['product'] = product
-        
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
-    
+        products = get_cached_products(self.request, list(self.cart))
+        for product_id, (quantity, price) in self.cart.items():
+            product = products.get(product_id)
+            if product is None:
+                continue
+            price = Decimal(price)
+            yield {
+                'product': product,
+                'quantity': quantity,
+                'price': price,
+                'total_price': price * quantity,
+            }
+
     def __len__(self):
         """Tổng số sản phẩm trong giỏ"""
-        return sum(item['quantity'] for item in self.cart.values())
-    
+        return sum(quantity for quantity, _ in self.cart.values())
+
     def get_total_price(self):
         """Tổng tiền giỏ hàng"""
         return sum(
-            Decimal(item['price']) * item['quantity'] 
-            for item in self.cart.values()
+            (Decimal(price) * quantity for quantity, price in self.cart.values()),
+            Decimal(0)
         )
-    
+
     def clear(self):
         """Xóa giỏ hàng"""
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
\ No newline at end of file
+        self.cart = {}
+        if settings.CART_SESSION_ID in self.session:
+            del self.session[settings.CART_SESSION_ID]
@@ -1,5 +1,7 @@
+from django.utils.functional import SimpleLazyObject
+
 from .cart import Cart
 
 def cart_context(request):
-    """Add cart to all templates"""
-    return {'cart': Cart(request)}
\ No newline at end of file
+    """Add cart to all templates (chỉ đọc session khi template dùng đến `cart`)"""
+    return {'cart': SimpleLazyObject(lambda: Cart(request))}
@@ -4,6 +4,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 
+from orders.reservations import available_to_sell
 from products.models import Product
 from .cart import Cart
 from .models import Coupon
@@ -45,14 +46,16 @@ def cart_add(request, product_id):
     quantity = int(request.POST.get('quantity', 1))
     override = request.POST.get('override') == 'true'
     
-    # Kiểm tra tồn kho
-    if quantity > product.stock:
+    # Kiểm tra tồn kho (trừ số lượng người khác đang giữ khi thanh toán)
+    user = request.user if request.user.is_authenticated else None
+    available = available_to_sell([product.id], user=user)[product.id]
+    if quantity > available:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'status': 'error',
-                'message': f'Chỉ còn {product.stock} sản phẩm trong kho!'
+                'message': f'Chỉ còn {available} sản phẩm trong kho!'
             })
-        messages.error(request, f'Chỉ còn {product.stock} sản phẩm trong kho!')
+        messages.error(request, f'Chỉ còn {available} sản phẩm trong kho!')
         return redirect('product_detail', slug=product.slug)
     
     cart.add(product=product, quantity=quantity, override_quantity=override)
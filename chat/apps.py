@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class ChatConfig(AppConfig):
+    name = 'chat'
+    verbose_name = 'Chat'
+
+    def ready(self):
+        from . import inbox
+
+        # Lần migrate thêm các cột hộp thư: điền lại từ tin nhắn cuối của mỗi phòng
+        post_migrate.connect(inbox.backfill, sender=self, dispatch_uid='chat_inbox_backfill')
@@ -0,0 +1,89 @@
+"""
+Bộ đệm ghi tin nhắn chat.
+
+ChatConsumer gửi tin nhắn tới nhóm ngay lập tức và chỉ đưa bản ghi vào bộ đệm; bộ đệm
+ghi xuống CSDL theo lô (bulk_create) khi đủ CHAT_FLUSH_SIZE tin hoặc sau
+CHAT_FLUSH_INTERVAL giây, kèm MỘT câu UPDATE cập nhật các phòng có tin mới (updated_at
+và các trường hộp thư admin, xem chat/inbox.py).
+Bộ đệm cũng được xả khi một kết nối đóng.
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import inbox
+
+logger = logging.getLogger(__name__)
+
+
+def write_messages(pending):
+    """
+    pending: danh sách dict room_id, sender_id, content, created_at.
+    Trả về dữ liệu hộp thư của các phòng vừa thay đổi.
+    """
+    from .models import ChatRoom, Message
+
+    room_ids = {item['room_id'] for item in pending}
+    rooms = dict(ChatRoom.objects.filter(pk__in=room_ids).values_list('pk', 'user_id'))
+    messages = [Message(**item) for item in pending if item['room_id'] in rooms]
+    if not messages:
+        return []
+    with transaction.atomic():
+        Message.objects.bulk_create(messages)
+        inbox.apply_messages(rooms, messages)
+    return inbox.changed_rooms({message.room_id for message in messages})
+
+
+class MessageBuffer:
+    def __init__(self):
+        self._pending = []
+        self._lock = None
+        self._timer = None
+
+    @property
+    def lock(self):
+        # Tạo trong event loop đang chạy (consumer), không phải lúc import
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def add(self, room_id, sender_id, content):
+        self._pending.append({
+            'room_id': room_id,
+            'sender_id': sender_id,
+            'content': content,
+            'created_at': timezone.now(),
+        })
+        if len(self._pending) >= settings.CHAT_FLUSH_SIZE:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.CHAT_FLUSH_INTERVAL)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                changed = await database_sync_to_async(write_messages)(pending)
+            except Exception:
+                # Giữ lại để lần xả sau thử lại, không làm rơi tin nhắn
+                logger.exception('Failed to write %d chat messages', len(pending))
+                self._pending = pending + self._pending
+                if self._timer is None:
+                    self._timer = asyncio.ensure_future(self._flush_later())
+                return 0
+        await inbox.push_rooms(changed)
+        return len(pending)
+
+
+buffer = MessageBuffer()
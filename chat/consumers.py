@@ -1,13 +1,36 @@
 import json
-from channels.generic.websocket import AsyncWebsocketConsumer
+import time
+
 from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.utils import timezone
 
+from .buffer import buffer
+from .inbox import ADMIN_GROUP
+from .models import ChatRoom
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Quyền vào phòng (chủ phòng hoặc admin) được kiểm tra MỘT lần khi kết nối và giữ lại
+    trên consumer; mỗi tin nhắn sau đó chỉ còn group_send + ghi vào bộ đệm.
+
+    Client gửi {'type': 'message' | 'typing' | 'heartbeat'}. Hiện diện được trao đổi qua
+    channel layer: mỗi consumer giữ danh sách người đang ở trong phòng, làm mới theo
+    heartbeat và coi là rời phòng nếu quá CHAT_PRESENCE_TTL giây không có heartbeat.
+    """
+    
     async def connect(self):
-        self.room_id = self.scope['url_route']['kwargs']['room_id']
+        self.room_id = int(self.scope['url_route']['kwargs']['room_id'])
         self.room_group_name = f'chat_{self.room_id}'
+        self.member = await self.authorize()
+        if self.member is None:
+            await self.close(code=4403)
+            return
+        
+        self.peers = {}
+        self.last_typing = 0
         
         # Join room group
         await self.channel_layer.group_add(
@@ -15,20 +38,59 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
         await self.accept()
+        await self.send(text_data=json.dumps({
+            'type': 'config',
+            'heartbeat_interval': settings.CHAT_HEARTBEAT_INTERVAL,
+            'typing_timeout': settings.CHAT_TYPING_TIMEOUT,
+        }))
+        await self.announce('join')
+    
+    @database_sync_to_async
+    def authorize(self):
+        """{'user_id', 'username', 'is_admin'} nếu được vào phòng, ngược lại None"""
+        user = self.scope['user']
+        if not user.is_authenticated:
+            return None
+        room = ChatRoom.objects.filter(pk=self.room_id, is_active=True).values('user_id').first()
+        if room is None:
+            return None
+        is_admin = bool(user.is_admin)
+        if room['user_id'] != user.id and not is_admin:
+            return None
+        return {'user_id': user.id, 'username': user.username, 'is_admin': is_admin}
     
     async def disconnect(self, close_code):
+        if getattr(self, 'member', None) is None:
+            return
+        await self.announce('leave')
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        await buffer.flush()
     
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data['message']
-        user = self.scope['user']
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        kind = data.get('type', 'message')
+        
+        if kind == 'heartbeat':
+            if self.expire_peers():
+                await self.send_presence()
+            await self.announce('heartbeat')
+        elif kind == 'typing':
+            await self.typing()
+        elif kind == 'message':
+            await self.message(str(data.get('message', '')))
+    
+    async def message(self, message):
+        if not message.strip():
+            return
         
-        # Save message to database
-        await self.save_message(user, message)
+        # Save message to database (ghi theo lô, xem chat/buffer.py)
+        await buffer.add(self.room_id, self.member['user_id'], message)
         
         # Send message to room group
         await self.channel_layer.group_send(
@@ -36,28 +98,115 @@ class ChatConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'chat_message',
                 'message': message,
-                'username': user.username,
+                'username': self.member['username'],
                 'timestamp': timezone.now().strftime('%H:%M'),
-                'is_admin': user.is_admin,
+                'is_admin': self.member['is_admin'],
+            }
+        )
+    
+    async def typing(self):
+        # Gửi tối đa một lần mỗi CHAT_TYPING_INTERVAL giây cho mỗi kết nối
+        now = time.monotonic()
+        if now - self.last_typing < settings.CHAT_TYPING_INTERVAL:
+            return
+        self.last_typing = now
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'chat_typing',
+                'sender': self.channel_name,
+                'username': self.member['username'],
             }
         )
     
+    async def announce(self, state, to=None):
+        event = {
+            'type': 'chat_presence',
+            'state': state,
+            'sender': self.channel_name,
+            **self.member,
+        }
+        if to:
+            await self.channel_layer.send(to, event)
+        else:
+            await self.channel_layer.group_send(self.room_group_name, event)
+    
+    def expire_peers(self):
+        """Bỏ các kết nối quá hạn heartbeat, trả về danh sách đã bỏ"""
+        now = time.monotonic()
+        expired = [channel for channel, peer in self.peers.items() if peer['expires'] < now]
+        return [self.peers.pop(channel) for channel in expired]
+    
+    def online(self):
+        users = {}
+        for peer in self.peers.values():
+            users[peer['user_id']] = {'username': peer['username'], 'is_admin': peer['is_admin']}
+        return list(users.values())
+    
     async def chat_message(self, event):
         await self.send(text_data=json.dumps({
+            'type': 'message',
             'message': event['message'],
             'username': event['username'],
             'timestamp': event['timestamp'],
             'is_admin': event['is_admin'],
         }))
     
-    @database_sync_to_async
-    def save_message(self, user, content):
-        from .models import ChatRoom, Message
-        room = ChatRoom.objects.get(id=self.room_id)
-        room.updated_at = timezone.now()
-        room.save()
-        return Message.objects.create(
-            room=room,
-            sender=user,
-            content=content
-        )
\ No newline at end of file
+    async def chat_typing(self, event):
+        if event['sender'] == self.channel_name:
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'typing',
+            'username': event['username'],
+        }))
+    
+    async def chat_presence(self, event):
+        channel = event['sender']
+        if channel == self.channel_name:
+            return
+        
+        before = self.online()
+        if event['state'] == 'leave':
+            self.peers.pop(channel, None)
+        else:
+            self.peers[channel] = {
+                'user_id': event['user_id'],
+                'username': event['username'],
+                'is_admin': event['is_admin'],
+                'expires': time.monotonic() + settings.CHAT_PRESENCE_TTL,
+            }
+            if event['state'] == 'join':
+                # Cho người mới vào biết mình đang ở trong phòng
+                await self.announce('here', to=channel)
+        self.expire_peers()
+        
+        if self.online() != before:
+            await self.send_presence()
+    
+    async def send_presence(self):
+        await self.send(text_data=json.dumps({
+            'type': 'presence',
+            'online': self.online(),
+        }))
+
+
+class AdminInboxConsumer(AsyncWebsocketConsumer):
+    """Đẩy các dòng hộp thư chat (tin mới, số chưa đọc) tới admin"""
+    
+    async def connect(self):
+        user = self.scope['user']
+        if user.is_anonymous or not await database_sync_to_async(lambda: user.is_admin)():
+            await self.close()
+            return
+        
+        await self.channel_layer.group_add(ADMIN_GROUP, self.channel_name)
+        await self.accept()
+    
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(ADMIN_GROUP, self.channel_name)
+    
+    async def inbox_update(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'inbox_update',
+            **event['room'],
+        }))
@@ -0,0 +1,139 @@
+"""
+Hộp thư chat của admin.
+
+Mỗi ChatRoom lưu sẵn last_message_at, last_message_preview và unread_for_admin, được
+cập nhật bằng một câu UPDATE cho cả lô tin nhắn (chat/buffer.py), nên danh sách phòng
+chỉ là một truy vấn theo chỉ mục chatroom_inbox_idx dù có hàng nghìn hội thoại.
+Thay đổi được đẩy tới nhóm ADMIN_GROUP (AdminInboxConsumer) qua channel layer.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db.models import (
+    Case, CharField, Count, DateTimeField, F, IntegerField, OuterRef, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Left
+from django.utils import timezone
+
+ADMIN_GROUP = 'chat_admin_inbox'
+PREVIEW_LENGTH = 200
+INBOX_ORDERING = ('-last_message_at', '-id')
+
+
+def room_payload(room):
+    """Dữ liệu một dòng hộp thư (room là dict từ values() hoặc ChatRoom)"""
+    if not isinstance(room, dict):
+        room = {
+            'id': room.id,
+            'user__username': room.user.username,
+            'last_message_at': room.last_message_at,
+            'last_message_preview': room.last_message_preview,
+            'unread_for_admin': room.unread_for_admin,
+        }
+    return {
+        'room_id': room['id'],
+        'username': room['user__username'],
+        'last_message_at': room['last_message_at'].isoformat(),
+        'timestamp': timezone.localtime(room['last_message_at']).strftime('%H:%M'),
+        'preview': room['last_message_preview'],
+        'unread': room['unread_for_admin'],
+    }
+
+
+def apply_messages(rooms, messages):
+    """
+    Cập nhật các phòng có tin mới bằng MỘT câu UPDATE.
+
+    rooms: {room_id: user_id của chủ phòng}; messages: các Message vừa ghi (theo thứ tự).
+    Chỉ tin nhắn của chủ phòng mới tính là chưa đọc với admin.
+    """
+    from .models import ChatRoom
+
+    last = {}
+    unread = {}
+    for message in messages:
+        last[message.room_id] = message
+        if message.sender_id == rooms[message.room_id]:
+            unread[message.room_id] = unread.get(message.room_id, 0) + 1
+    if not last:
+        return
+
+    def per_room(values, output_field):
+        return Case(
+            *[When(pk=room_id, then=Value(value)) for room_id, value in values.items()],
+            output_field=output_field,
+        )
+
+    ChatRoom.objects.filter(pk__in=list(last)).update(
+        updated_at=timezone.now(),
+        last_message_at=per_room(
+            {room_id: m.created_at for room_id, m in last.items()}, DateTimeField()
+        ),
+        last_message_preview=per_room(
+            {room_id: m.content[:PREVIEW_LENGTH] for room_id, m in last.items()}, CharField()
+        ),
+        unread_for_admin=F('unread_for_admin') + Case(
+            *[When(pk=room_id, then=Value(count)) for room_id, count in unread.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def rebuild(rooms):
+    """Tính lại các trường hộp thư từ bảng Message cho queryset phòng, trả về số phòng"""
+    from .models import Message
+
+    last_message = Message.objects.filter(room=OuterRef('pk')).order_by('-created_at', '-id')
+    unread = Message.objects.filter(
+        room=OuterRef('pk'), is_read=False, sender=OuterRef('user_id')
+    ).order_by().values('room').annotate(count=Count('id')).values('count')
+    return rooms.update(
+        last_message_at=Coalesce(Subquery(last_message.values('created_at')[:1]), 'created_at'),
+        last_message_preview=Coalesce(
+            Left(Subquery(last_message.values('content')[:1]), PREVIEW_LENGTH), Value('')
+        ),
+        unread_for_admin=Coalesce(Subquery(unread), 0),
+    )
+
+
+def backfill(apps=None, using='default', **kwargs):
+    """post_migrate: điền hộp thư cho các phòng có từ trước khi thêm cột (last_message_at NULL)"""
+    from .models import ChatRoom
+
+    if apps is not None:
+        # Bỏ qua nếu migration thêm cột chưa được áp dụng
+        try:
+            fields = {field.name for field in apps.get_model('chat', 'ChatRoom')._meta.fields}
+        except LookupError:
+            return 0
+        if 'last_message_at' not in fields:
+            return 0
+    return rebuild(ChatRoom.objects.using(using).filter(last_message_at__isnull=True))
+
+
+def changed_rooms(room_ids):
+    from .models import ChatRoom
+
+    return [
+        room_payload(room)
+        for room in ChatRoom.objects.filter(pk__in=room_ids).values(
+            'id', 'user__username', 'last_message_at', 'last_message_preview', 'unread_for_admin'
+        )
+    ]
+
+
+async def push_rooms(payloads):
+    channel_layer = get_channel_layer()
+    for payload in payloads:
+        await channel_layer.group_send(ADMIN_GROUP, {'type': 'inbox_update', 'room': payload})
+
+
+def mark_read_by_admin(room, admin):
+    """Đánh dấu đã đọc (dùng chỉ mục message_room_unread_idx) và đẩy cập nhật tới admin"""
+    from .models import ChatRoom
+
+    room.messages.filter(is_read=False).exclude(sender=admin).update(is_read=True)
+    if room.unread_for_admin:
+        ChatRoom.objects.filter(pk=room.pk).update(unread_for_admin=0)
+        room.unread_for_admin = 0
+        async_to_sync(push_rooms)([room_payload(room)])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from chat import inbox
+from chat.models import ChatRoom
+
+
+class Command(BaseCommand):
+    help = 'Recompute last message and unread counters of chat rooms for the admin inbox'
+    
+    def handle(self, *args, **options):
+        updated = inbox.rebuild(ChatRoom.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt inbox fields for {updated} chat rooms'))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 
@@ -10,11 +11,30 @@ class ChatRoom(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Hộp thư admin (cập nhật khi ghi tin nhắn, xem chat/inbox.py). Cho phép NULL để khi
+    # thêm cột, phòng cũ không nhận giờ chạy migrate; post_migrate điền lại từ tin nhắn cuối.
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=200, blank=True)
+    unread_for_admin = models.PositiveIntegerField(default=0)
+    
     def __str__(self):
         return f"Chat: {self.user.username}"
     
+    def save(self, *args, **kwargs):
+        # Phòng mới đứng đầu hộp thư cho tới khi có tin nhắn
+        if self.last_message_at is None:
+            self.last_message_at = timezone.now()
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(
+                fields=['-last_message_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='chatroom_inbox_idx',
+            ),
+        ]
 
 
 class Message(models.Model):
@@ -22,10 +42,19 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Gán lúc nhận tin (chat/buffer.py ghi theo lô sau đó)
+    created_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
     
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['room', '-created_at', '-id'], name='message_room_created_idx'),
+            models.Index(
+                fields=['room', 'sender'],
+                condition=models.Q(is_read=False),
+                name='message_room_unread_idx',
+            ),
+        ]
\ No newline at end of file
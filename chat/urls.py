@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.chat_room_view, name='chat_room'),
+    path('rooms/<int:room_id>/messages/', views.message_history_api, name='chat_message_history'),
     path('admin/', views.admin_chat_list_view, name='admin_chat_list'),
     path('admin/<int:room_id>/', views.admin_chat_room_view, name='admin_chat_room'),
 ]
\ No newline at end of file
@@ -1,10 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils import timezone
 
+from products.pagination import CursorPaginator
+from . import inbox
 from .models import ChatRoom, Message
 from accounts.models import User
 
+HISTORY_PAGE_SIZE = 50
+INBOX_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+# Mới nhất trước; trang sau (next_cursor) là các tin cũ hơn
+HISTORY_ORDERING = ('-created_at', '-id')
+
+
+def message_history(room, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """Một trang tin nhắn theo con trỏ, trả về (tin nhắn cũ -> mới, con trỏ tới trang cũ hơn)"""
+    messages = room.messages.select_related('sender')
+    page = CursorPaginator(messages, HISTORY_ORDERING, limit).get_page(cursor)
+    return list(reversed(page.object_list)), page.next_cursor
+
 
 @login_required
 def chat_room_view(request):
@@ -15,23 +31,30 @@ def chat_room_view(request):
         defaults={'is_active': True}
     )
     
-    messages = room.messages.all()[:50]
+    messages, older_cursor = message_history(room)
     
     context = {
         'room': room,
         'messages': messages,
+        'older_cursor': older_cursor,
     }
     return render(request, 'chat/chat_room.html', context)
 
 
 @login_required
 def admin_chat_list_view(request):
-    """Admin xem danh sách chat"""
+    """Admin xem danh sách chat (hộp thư, phân trang theo con trỏ)"""
     if not request.user.is_admin:
         return redirect('home')
     
-    rooms = ChatRoom.objects.filter(is_active=True).order_by('-updated_at')
-    return render(request, 'chat/admin_chat_list.html', {'rooms': rooms})
+    rooms = ChatRoom.objects.filter(is_active=True).select_related('user', 'admin')
+    page = CursorPaginator(rooms, inbox.INBOX_ORDERING, INBOX_PAGE_SIZE).get_page(request.GET.get('cursor'))
+    
+    context = {
+        'rooms': page,
+        'page_obj': page,
+    }
+    return render(request, 'chat/admin_chat_list.html', context)
 
 
 @login_required
@@ -40,15 +63,45 @@ def admin_chat_room_view(request, room_id):
     if not request.user.is_admin:
         return redirect('home')
     
-    room = get_object_or_404(ChatRoom, id=room_id)
+    room = get_object_or_404(ChatRoom.objects.select_related('user'), id=room_id)
     
     # Mark messages as read
-    room.messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
+    inbox.mark_read_by_admin(room, request.user)
     
-    messages = room.messages.all()[:100]
+    messages, older_cursor = message_history(room, limit=100)
     
     context = {
         'room': room,
         'messages': messages,
+        'older_cursor': older_cursor,
     }
-    return render(request, 'chat/admin_chat_room.html', context)
\ No newline at end of file
+    return render(request, 'chat/admin_chat_room.html', context)
+
+
+@login_required
+def message_history_api(request, room_id):
+    """API lịch sử tin nhắn: ?cursor=<con trỏ cũ hơn>&limit=50"""
+    room = get_object_or_404(ChatRoom, id=room_id)
+    if room.user_id != request.user.id and not request.user.is_admin:
+        raise Http404
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), 1), MAX_HISTORY_PAGE_SIZE)
+    except ValueError:
+        limit = HISTORY_PAGE_SIZE
+    messages, older_cursor = message_history(room, request.GET.get('cursor'), limit)
+    
+    return JsonResponse({
+        'messages': [
+            {
+                'id': message.id,
+                'message': message.content,
+                'username': message.sender.username,
+                'timestamp': timezone.localtime(message.created_at).strftime('%H:%M'),
+                'created_at': message.created_at.isoformat(),
+                'is_read': message.is_read,
+            }
+            for message in messages
+        ],
+        'older_cursor': older_cursor,
+    })
\ No newline at end of file
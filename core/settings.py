@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'chat',
     'ai_assistant',
     'notifications',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -77,12 +78,15 @@ TEMPLATES = [
 # ASGI Configuration
 ASGI_APPLICATION = 'core.asgi.application'
 
+# Redis
+REDIS_URL = env('REDIS_URL', default='redis://localhost:6379')
+
 # Channels Layer
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [env('REDIS_URL', default='redis://localhost:6379')],
+            "hosts": [REDIS_URL],
         },
     },
 }
@@ -122,6 +126,12 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache file ảnh VietQR (orders/vietqr.py). File cũ hơn VIETQR_CACHE_MAX_AGE_DAYS được dọn
+# tự động ở luồng nền, hoặc bằng cron: python manage.py prune_qr_cache
+VIETQR_CACHE_DIR = env('VIETQR_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'vietqr'))
+VIETQR_CACHE_MAX_AGE_DAYS = env.int('VIETQR_CACHE_MAX_AGE_DAYS', default=7)
+VIETQR_CACHE_PRUNE_INTERVAL = 60 * 60
+
 # Default primary key
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -155,8 +165,84 @@ LOGOUT_REDIRECT_URL = '/'
 # OpenAI
 OPENAI_API_KEY = env('OPENAI_API_KEY', default='')
 
+# Product view counter buffer (see products/view_counter.py): 'redis' keeps counts across
+# restarts and deploys; 'local' (per-process memory) is for development only
+VIEW_COUNTER_BACKEND = env('VIEW_COUNTER_BACKEND', default='redis')
+VIEW_COUNTER_FLUSH_INTERVAL = env.int('VIEW_COUNTER_FLUSH_INTERVAL', default=30)
+
+# Product list pagination: 'page' (OFFSET) or 'cursor' (keyset, see products/pagination.py)
+PRODUCT_PAGINATION = env('PRODUCT_PAGINATION', default='page')
+
+# Stock holds placed when checkout starts (see orders/reservations.py)
+STOCK_HOLD_SECONDS = env.int('STOCK_HOLD_SECONDS', default=600)
+
+# Outbox task queue ('database' or 'memory' for tests, see outbox/queue.py)
+OUTBOX_BACKEND = env('OUTBOX_BACKEND', default='database')
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=5)
+
+# Chat messages are written in batches (see chat/buffer.py)
+CHAT_FLUSH_INTERVAL = env.float('CHAT_FLUSH_INTERVAL', default=0.5)
+CHAT_FLUSH_SIZE = env.int('CHAT_FLUSH_SIZE', default=100)
+# Presence/typing in chat rooms (see chat/consumers.py), in seconds
+CHAT_HEARTBEAT_INTERVAL = env.int('CHAT_HEARTBEAT_INTERVAL', default=20)
+CHAT_PRESENCE_TTL = env.int('CHAT_PRESENCE_TTL', default=60)
+CHAT_TYPING_INTERVAL = env.float('CHAT_TYPING_INTERVAL', default=2)
+CHAT_TYPING_TIMEOUT = env.int('CHAT_TYPING_TIMEOUT', default=5)
+
+# Broadcast notifications to all users (see notifications/broadcast.py)
+NOTIFICATION_BROADCAST_CHUNK_SIZE = env.int('NOTIFICATION_BROADCAST_CHUNK_SIZE', default=1000)
+NOTIFICATION_BROADCAST_RATE = env.int('NOTIFICATION_BROADCAST_RATE', default=2000)
+# Days to keep notifications per type (0 = forever), see notifications/retention.py
+NOTIFICATION_RETENTION_DAYS = {
+    'order': env.int('NOTIFICATION_RETENTION_ORDER_DAYS', default=365),
+    'promo': env.int('NOTIFICATION_RETENTION_PROMO_DAYS', default=30),
+    'system': env.int('NOTIFICATION_RETENTION_SYSTEM_DAYS', default=90),
+    'chat': env.int('NOTIFICATION_RETENTION_CHAT_DAYS', default=90),
+}
+NOTIFICATION_ARCHIVE_DIR = env('NOTIFICATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'notifications'))
+NOTIFICATION_PAGE_SIZE = env.int('NOTIFICATION_PAGE_SIZE', default=20)
+
+# Cache: 'redis' (dùng chung REDIS_URL với Channels) hoặc 'locmem' cho test/dev
+CACHE_BACKEND = env('CACHE_BACKEND', default='redis')
+REDIS_CACHE_MAX_CONNECTIONS = env.int('REDIS_CACHE_MAX_CONNECTIONS', default=50)
+
+
+def _cache(prefix, timeout):
+    if CACHE_BACKEND == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': prefix,
+            'TIMEOUT': timeout,
+        }
+    return {
+        # Redis lỗi thì coi như cache miss, không trả lỗi 500 (core/cache.py)
+        'BACKEND': 'core.cache.FailOpenRedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': prefix,
+        'TIMEOUT': timeout,
+        'OPTIONS': {
+            # Mỗi process giữ một connection pool cho mỗi alias
+            'max_connections': REDIS_CACHE_MAX_CONNECTIONS,
+            # Ngắn để khi Redis sập, mỗi lần gọi cache không giữ request lâu
+            'socket_connect_timeout': 0.5,
+            'socket_timeout': 1,
+            'retry_on_timeout': True,
+        },
+    }
+
+
+CACHES = {
+    'default': _cache('shop', 60 * 5),
+    # Dữ liệu danh mục/sản phẩm (trang chủ, số lượng kết quả)
+    'catalog': _cache('catalog', 60 * 15),
+    'sessions': _cache('session', 60 * 60 * 24 * 14),
+}
+
 # Session
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# 'cached_db': đọc từ cache, ghi cả DB (mặc định); 'cache': chỉ Redis, không dùng bảng django_session
+SESSION_STORE = env('SESSION_STORE', default='cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_STORE}'
+SESSION_CACHE_ALIAS = 'sessions'
 CART_SESSION_ID = 'cart'
 ALLOWED_HOSTS = [
     ".railway.app",
@@ -0,0 +1,170 @@
+"""
+Gửi thông báo (khuyến mãi...) cho toàn bộ người dùng.
+
+- 'write': duyệt id người dùng theo khóa (id > last_user_id, không OFFSET), mỗi lô một
+  câu bulk_create Notification rồi đẩy qua channel layer, giới hạn tốc độ theo
+  NOTIFICATION_BROADCAST_RATE thông báo/giây. Tiến độ lưu trên Broadcast trong cùng
+  transaction với lô, nên chạy lại sẽ gửi tiếp chứ không gửi trùng. Qua outbox, mỗi lô
+  là một tác vụ ngắn (fan_out_chunk) tự xếp lô kế tiếp, trễ theo tốc độ cho phép, nên
+  không tác vụ nào chạy quá VISIBILITY_TIMEOUT dù số người dùng lớn.
+- 'read': chỉ tạo một dòng Broadcast và gửi MỘT sự kiện tới nhóm BROADCAST_GROUP mà mọi
+  NotificationConsumer cùng tham gia; danh sách/số chưa đọc ghép Broadcast khi đọc.
+
+Chạy từ trang admin (qua outbox) hoặc: python manage.py broadcast_notification
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from accounts.models import User
+from outbox.queue import enqueue
+from .counters import bump_broadcast_version
+from .dispatch import create_batch, send_events
+from .models import Broadcast, BroadcastRead
+
+BROADCAST_GROUP = 'notifications_broadcast'
+
+
+def recipients():
+    return User.objects.filter(is_active=True)
+
+
+def start_broadcast(title, message, link='', notification_type='promo', mode='write', created_by=None):
+    broadcast = Broadcast.objects.create(
+        title=title,
+        message=message,
+        link=link,
+        notification_type=notification_type,
+        mode=mode,
+        created_by=created_by,
+    )
+    if mode == 'read':
+        publish(broadcast)
+    else:
+        enqueue('notifications.broadcast', broadcast_id=broadcast.id, after=broadcast.last_user_id)
+    return broadcast
+
+
+def publish(broadcast):
+    """Broadcast dạng 'read': không chép dòng nào, chỉ báo cho người đang online"""
+    Broadcast.objects.filter(pk=broadcast.pk).update(status='done', finished_at=timezone.now())
+
+    def push():
+        bump_broadcast_version()
+        send_events([(None, {
+            'type': 'send_broadcast',
+            'id': broadcast.id,
+            'title': broadcast.title,
+            'message': broadcast.message,
+            'notification_type': broadcast.notification_type,
+            'link': broadcast.link,
+            'created_at': broadcast.created_at.isoformat(),
+        })], group=BROADCAST_GROUP)
+
+    transaction.on_commit(push)
+
+
+def _send_chunk(broadcast, chunk_size):
+    """
+    Gửi một lô tiếp theo của broadcast (đã khóa dòng, trong transaction).
+    Trả về số người vừa gửi, 0 khi đã gửi hết (broadcast chuyển sang 'done').
+    """
+    user_ids = list(
+        recipients().filter(pk__gt=broadcast.last_user_id).order_by('pk').values_list(
+            'pk', flat=True
+        )[:chunk_size]
+    )
+    if not user_ids:
+        broadcast.status = 'done'
+        broadcast.finished_at = timezone.now()
+        broadcast.save(update_fields=['status', 'finished_at'])
+        return 0
+    create_batch(
+        user_ids, broadcast.title, broadcast.message, broadcast.notification_type, broadcast.link
+    )
+    broadcast.status = 'running'
+    broadcast.last_user_id = user_ids[-1]
+    broadcast.recipients += len(user_ids)
+    broadcast.save(update_fields=['status', 'last_user_id', 'recipients'])
+    return len(user_ids)
+
+
+def fan_out_chunk(broadcast_id, after, chunk_size=None, rate=None):
+    """
+    Một lô của broadcast chạy qua outbox; lô kế tiếp là tác vụ mới, xếp trong cùng
+    transaction. after: last_user_id lúc xếp tác vụ; khác đi nghĩa là lô này đã được
+    gửi (tác vụ bị nhận lại/chạy lại), khi đó không làm gì để chuỗi tác vụ không nhân đôi.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_BROADCAST_CHUNK_SIZE
+    rate = settings.NOTIFICATION_BROADCAST_RATE if rate is None else rate
+
+    with transaction.atomic():
+        broadcast = Broadcast.objects.select_for_update().get(pk=broadcast_id)
+        if broadcast.status == 'done' or broadcast.last_user_id != after:
+            return broadcast
+        sent = _send_chunk(broadcast, chunk_size)
+        if sent:
+            enqueue(
+                'notifications.broadcast',
+                delay=timedelta(seconds=sent / rate) if rate else None,
+                broadcast_id=broadcast.id,
+                after=broadcast.last_user_id,
+            )
+    return broadcast
+
+
+def fan_out(broadcast_id, chunk_size=None, rate=None, progress=None):
+    """
+    Gửi hết Broadcast dạng 'write' trong tiến trình hiện tại (lệnh broadcast_notification).
+    rate: số thông báo tối đa mỗi giây (0 = không giới hạn).
+    progress(broadcast, sent, total, elapsed) được gọi sau mỗi lô.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_BROADCAST_CHUNK_SIZE
+    rate = settings.NOTIFICATION_BROADCAST_RATE if rate is None else rate
+
+    broadcast = Broadcast.objects.get(pk=broadcast_id)
+    if broadcast.status == 'done':
+        return broadcast
+    total = recipients().filter(pk__gt=broadcast.last_user_id).count()
+
+    started = time.monotonic()
+    sent = 0
+    while True:
+        with transaction.atomic():
+            # Khóa dòng để hai tiến trình không gửi cùng một lô
+            broadcast = Broadcast.objects.select_for_update().get(pk=broadcast_id)
+            count = _send_chunk(broadcast, chunk_size)
+        if not count:
+            break
+
+        sent += count
+        elapsed = time.monotonic() - started
+        if progress:
+            progress(broadcast, sent, total, elapsed)
+        if rate:
+            # Không vượt quá `rate` thông báo/giây tính từ lúc bắt đầu
+            delay = sent / rate - elapsed
+            if delay > 0:
+                time.sleep(delay)
+    return broadcast
+
+
+def visible_broadcasts(user):
+    """Broadcast dạng 'read' tạo sau khi người dùng đăng ký, kèm is_read"""
+    return Broadcast.objects.filter(mode='read', created_at__gte=user.date_joined).annotate(
+        is_read=Exists(BroadcastRead.objects.filter(broadcast=OuterRef('pk'), user=user))
+    )
+
+
+def mark_broadcasts_read(user, broadcast_ids=None):
+    broadcasts = visible_broadcasts(user).filter(is_read=False)
+    if broadcast_ids is not None:
+        broadcasts = broadcasts.filter(pk__in=broadcast_ids)
+    return len(BroadcastRead.objects.bulk_create(
+        [BroadcastRead(broadcast_id=pk, user=user) for pk in broadcasts.values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    ))
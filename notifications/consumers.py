@@ -1,6 +1,8 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .broadcast import BROADCAST_GROUP
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -15,6 +17,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             self.group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(BROADCAST_GROUP, self.channel_name)
         await self.accept()
     
     async def disconnect(self, close_code):
@@ -23,11 +26,36 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_discard(BROADCAST_GROUP, self.channel_name)
     
     async def send_notification(self, event):
         await self.send(text_data=json.dumps({
             'type': 'notification',
+            'id': event['id'],
             'title': event['title'],
             'message': event['message'],
             'notification_type': event['notification_type'],
+            'link': event['link'],
+            'created_at': event['created_at'],
+            'unread_count': event['unread_count'],
+        }))
+    
+    async def send_broadcast(self, event):
+        # Số chưa đọc khác nhau với từng người, client tự cộng thêm 1
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            'id': event['id'],
+            'title': event['title'],
+            'message': event['message'],
+            'notification_type': event['notification_type'],
+            'link': event['link'],
+            'created_at': event['created_at'],
+            'unread_count': None,
+            'broadcast': True,
+        }))
+    
+    async def unread_count(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_count': event['unread_count'],
         }))
\ No newline at end of file
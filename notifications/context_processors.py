@@ -1,17 +1,25 @@
+from django.utils.functional import SimpleLazyObject
+
+from .broadcast import visible_broadcasts
+from .counters import get_unread_count
 from .models import Notification
 
 
 def notifications_context(request):
-    if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).count()
-        recent_notifications = Notification.objects.filter(
-            user=request.user
-        )[:5]
-        return {
-            'unread_notifications_count': unread_count,
-            'recent_notifications': recent_notifications,
-        }
-    return {}
\ No newline at end of file
+    """Chỉ truy vấn khi template thực sự dùng đến (badge / dropdown trên header)"""
+    def unread_count():
+        if request.user.is_authenticated:
+            return get_unread_count(request.user.id)
+        return 0
+    
+    def recent_notifications():
+        if request.user.is_authenticated:
+            items = list(Notification.objects.filter(user=request.user)[:5])
+            items += visible_broadcasts(request.user)[:5]
+            return sorted(items, key=lambda item: item.created_at, reverse=True)[:5]
+        return []
+    
+    return {
+        'unread_notifications_count': SimpleLazyObject(unread_count),
+        'recent_notifications': SimpleLazyObject(recent_notifications),
+    }
@@ -0,0 +1,81 @@
+"""
+Số thông báo chưa đọc của từng người dùng, lưu trong cache.
+
+Gồm Notification chưa đọc và Broadcast dạng 'read' chưa đọc. Bị xóa khi có thông báo
+mới / đánh dấu đã đọc (notifications/signals.py); được ghi lại giá trị mới khi
+notifications/dispatch.py đẩy sự kiện tới trình duyệt. Mỗi giá trị lưu kèm phiên bản
+broadcast: tạo Broadcast dạng 'read' chỉ cần tăng phiên bản thay vì xóa cache của
+từng người.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+CACHE_TIMEOUT = 60 * 5
+BROADCAST_VERSION_KEY = 'notifications:broadcast_version'
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def count_unread(user_ids):
+    """{user_id: số chưa đọc} cho cả nhóm người dùng, số truy vấn không đổi"""
+    from accounts.models import User
+    from .models import Broadcast, BroadcastRead, Notification
+
+    user_ids = list(user_ids)
+    counts = dict.fromkeys(user_ids, 0)
+    counts.update(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False).order_by().values_list(
+            'user_id'
+        ).annotate(count=Count('id'))
+    )
+
+    broadcasts = list(Broadcast.objects.filter(mode='read').values_list('created_at', flat=True))
+    if broadcasts:
+        joined = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'date_joined'))
+        reads = dict(
+            BroadcastRead.objects.filter(user_id__in=user_ids).order_by().values_list(
+                'user_id'
+            ).annotate(count=Count('id'))
+        )
+        for user_id in user_ids:
+            if user_id in joined:
+                visible = sum(1 for created_at in broadcasts if created_at >= joined[user_id])
+                counts[user_id] += max(visible - reads.get(user_id, 0), 0)
+    return counts
+
+
+def get_unread_count(user_id):
+    values = cache.get_many([_key(user_id), BROADCAST_VERSION_KEY])
+    version = values.get(BROADCAST_VERSION_KEY, 0)
+    cached = values.get(_key(user_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    count = count_unread([user_id])[user_id]
+    cache.set(_key(user_id), (version, count), CACHE_TIMEOUT)
+    return count
+
+
+def set_unread_counts(counts):
+    """counts: {user_id: số chưa đọc}"""
+    version = cache.get(BROADCAST_VERSION_KEY, 0)
+    cache.set_many({_key(user_id): (version, count) for user_id, count in counts.items()}, CACHE_TIMEOUT)
+
+
+def bump_broadcast_version():
+    """Làm mọi số chưa đọc đang cache hết hiệu lực (khi có Broadcast dạng 'read' mới)"""
+    try:
+        cache.incr(BROADCAST_VERSION_KEY)
+    except ValueError:
+        cache.set(BROADCAST_VERSION_KEY, 1, None)
+
+
+def invalidate_unread_count(user_id):
+    cache.delete(_key(user_id))
+
+
+def invalidate_unread_counts(user_ids):
+    """Một lệnh xóa cache cho cả nhóm người dùng"""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
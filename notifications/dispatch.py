@@ -0,0 +1,104 @@
+"""
+Tạo thông báo và đẩy tới trình duyệt qua channel layer.
+
+notify()/create_batch() ghi Notification rồi, SAU KHI transaction commit, gửi sự kiện
+tới nhóm notifications_<user_id> (NotificationConsumer) kèm số chưa đọc mới. Số chưa
+đọc được tính một lần cho cả lô (counters.count_unread) và ghi vào cache
+(notifications/counters.py), nên header không phải đếm lại ở lần tải trang sau.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .counters import count_unread, set_unread_counts
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def group_name(user_id):
+    return f'notifications_{user_id}'
+
+
+def unread_counts(user_ids):
+    counts = count_unread(user_ids)
+    set_unread_counts(counts)
+    return counts
+
+
+def notification_event(notification, unread_count):
+    return {
+        'type': 'send_notification',
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'link': notification.link,
+        'created_at': notification.created_at.isoformat(),
+        'unread_count': unread_count,
+    }
+
+
+def send_events(events, group=None):
+    """
+    events: danh sách (user_id, event); gửi trong một lần vào event loop.
+    group: gửi mọi event tới nhóm này thay vì nhóm của từng người dùng.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not events:
+        return
+
+    async def send_all():
+        for user_id, event in events:
+            await channel_layer.group_send(group or group_name(user_id), event)
+
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        # Thông báo đã được lưu, client sẽ thấy khi tải lại trang
+        logger.exception('Failed to push %d notification events', len(events))
+
+
+def push_notifications(notifications):
+    counts = unread_counts({notification.user_id for notification in notifications})
+    send_events([
+        (notification.user_id, notification_event(notification, counts[notification.user_id]))
+        for notification in notifications
+    ])
+
+
+def push_unread_count(user_id):
+    """Gửi số chưa đọc hiện tại (sau khi đánh dấu đã đọc)"""
+    count = unread_counts([user_id])[user_id]
+    send_events([(user_id, {'type': 'unread_count', 'unread_count': count})])
+
+
+def notify(user_id, title, message, notification_type='system', link=''):
+    notification = Notification.objects.create(
+        user_id=user_id,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        link=link,
+    )
+    transaction.on_commit(lambda: push_notifications([notification]))
+    return notification
+
+
+def create_batch(user_ids, title, message, notification_type='system', link=''):
+    """Một câu INSERT cho cả lô; đẩy sự kiện sau khi commit"""
+    batch = Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            link=link,
+        )
+        for user_id in user_ids
+    ])
+    transaction.on_commit(lambda: push_notifications(batch))
+    return batch
+
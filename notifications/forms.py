@@ -0,0 +1,16 @@
+from django import forms
+
+from .models import Broadcast
+
+
+class BroadcastForm(forms.ModelForm):
+    class Meta:
+        model = Broadcast
+        fields = ['title', 'message', 'notification_type', 'link', 'mode']
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'form-control'}),
+            'message': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
+            'notification_type': forms.Select(attrs={'class': 'form-select'}),
+            'link': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '/products/...'}),
+            'mode': forms.Select(attrs={'class': 'form-select'}),
+        }
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.broadcast import fan_out, start_broadcast
+from notifications.models import Broadcast, Notification
+
+
+class Command(BaseCommand):
+    help = 'Send a notification to every active user (bulk insert, rate-limited push)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--title')
+        parser.add_argument('--message')
+        parser.add_argument('--link', default='')
+        parser.add_argument('--type', default='promo', choices=[value for value, _ in Notification.TYPE_CHOICES])
+        parser.add_argument(
+            '--mode', default='write', choices=[value for value, _ in Broadcast.MODE_CHOICES],
+            help='"write" copies a row per user, "read" stores a single shared row',
+        )
+        parser.add_argument('--resume', type=int, metavar='BROADCAST_ID', help='Continue an unfinished broadcast')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--rate', type=int, help='Max notifications per second (0 = unlimited)')
+    
+    def handle(self, *args, **options):
+        if options['resume']:
+            broadcast_id = options['resume']
+        else:
+            if not options['title'] or not options['message']:
+                raise CommandError('--title and --message are required')
+            if options['mode'] == 'read':
+                broadcast = start_broadcast(
+                    options['title'], options['message'], options['link'], options['type'], mode='read'
+                )
+                self.stdout.write(self.style.SUCCESS(f'Published shared broadcast #{broadcast.id}'))
+                return
+            # Tạo trực tiếp (không qua outbox) để chạy ngay trong lệnh này
+            broadcast_id = Broadcast.objects.create(
+                title=options['title'],
+                message=options['message'],
+                link=options['link'],
+                notification_type=options['type'],
+            ).id
+        
+        def progress(broadcast, sent, total, elapsed):
+            rate = sent / elapsed if elapsed else 0
+            self.stdout.write(f'Broadcast #{broadcast.id}: {sent}/{total} sent ({rate:.0f}/s)')
+        
+        broadcast = fan_out(
+            broadcast_id, chunk_size=options['chunk_size'], rate=options['rate'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Broadcast #{broadcast.id} done: {broadcast.recipients} recipients'
+        ))
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.models import Notification
+from notifications.retention import expired_filter, purge, purge_broadcasts
+
+
+class Command(BaseCommand):
+    help = 'Delete notifications older than NOTIFICATION_RETENTION_DAYS in small batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument(
+            '--archive', action='store_true',
+            help='Write deleted rows to NOTIFICATION_ARCHIVE_DIR (gzipped JSON lines) first',
+        )
+        parser.add_argument('--archive-dir', help='Archive directory (implies --archive)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count expired notifications')
+    
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = Notification.objects.filter(expired_filter()).count()
+            self.stdout.write(f'{count} notifications are past their retention period')
+            return
+        
+        archive_dir = options['archive_dir']
+        if options['archive'] and not archive_dir:
+            archive_dir = settings.NOTIFICATION_ARCHIVE_DIR
+        
+        deleted = purge(
+            batch_size=options['batch_size'],
+            archive_dir=archive_dir,
+            pause=options['pause'],
+            progress=lambda deleted: self.stdout.write(f'Deleted {deleted} notifications...'),
+        )
+        broadcasts = purge_broadcasts(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} notifications and {broadcasts} broadcasts'
+            + (f' (archived to {archive_dir})' if archive_dir and deleted else '')
+        ))
@@ -22,4 +22,61 @@ class Notification(models.Model):
         return f"{self.title} - {self.user.username}"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Tương đương (user, is_read, -created_at) nhưng chỉ chứa thông báo chưa đọc
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False), name='notif_user_unread_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_created_idx'),
+            # Xóa thông báo quá hạn theo loại (notifications/retention.py)
+            models.Index(fields=['notification_type', 'created_at'], name='notif_type_created_idx'),
+        ]
+
+class Broadcast(models.Model):
+    """
+    Thông báo gửi cho mọi người dùng.
+    'write': chép thành một Notification cho từng người (notifications/broadcast.py).
+    'read': chỉ lưu một dòng này, ghép vào danh sách thông báo khi đọc.
+    """
+    MODE_CHOICES = [
+        ('write', 'Gửi tới từng người'),
+        ('read', 'Dùng chung một bản'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Đang chờ'),
+        ('running', 'Đang gửi'),
+        ('done', 'Hoàn tất'),
+    ]
+    
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES, default='promo')
+    link = models.CharField(max_length=200, blank=True)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='write')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    recipients = models.PositiveIntegerField(default=0)
+    # Người dùng cuối cùng đã nhận (gửi tiếp từ đây nếu bị dừng giữa chừng)
+    last_user_id = models.PositiveBigIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return self.title
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['mode', '-created_at'], name='broadcast_mode_created_idx'),
+        ]
+
+
+class BroadcastRead(models.Model):
+    """Người dùng đã đọc một Broadcast dạng 'read'"""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_read'),
+        ]
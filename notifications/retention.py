@@ -0,0 +1,125 @@
+"""
+Thời hạn lưu thông báo theo loại (NOTIFICATION_RETENTION_DAYS).
+
+purge() xóa thông báo quá hạn lần lượt theo từng loại, mỗi lô nhỏ bằng khóa chính (mỗi lô
+một transaction ngắn). Lô được lấy theo chỉ mục notif_type_created_idx
+(notification_type = ?, created_at < ?, theo thứ tự created_at) nên không phải sắp xếp
+toàn bộ phần quá hạn ở mỗi lô. Có thể ghi lô đó ra file JSON Lines nén
+gzip trước khi xóa. Lô bị xóa bằng một câu DELETE theo khóa chính, không qua signal
+từng dòng; cache số chưa đọc của những người bị ảnh hưởng được xóa một lần sau commit.
+Broadcast quá hạn cũng bị xóa: BroadcastRead của nó được xóa trước theo từng lô.
+Chạy định kỳ: python manage.py purge_notifications
+"""
+import gzip
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import bump_broadcast_version, invalidate_unread_counts
+from .models import Broadcast, BroadcastRead, Notification
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'title', 'message', 'notification_type', 'link', 'is_read', 'created_at')
+
+
+def cutoffs(now=None):
+    """{notification_type: thời điểm mà thông báo cũ hơn sẽ bị xóa}"""
+    now = now or timezone.now()
+    return {
+        notification_type: now - timedelta(days=days)
+        for notification_type, days in settings.NOTIFICATION_RETENTION_DAYS.items()
+        if days
+    }
+
+
+def expired_filter(now=None):
+    condition = Q(pk__in=[])
+    for notification_type, cutoff in cutoffs(now).items():
+        condition |= Q(notification_type=notification_type, created_at__lt=cutoff)
+    return condition
+
+
+class Archive:
+    """Ghi các dòng bị xóa ra <dir>/notifications-<thời điểm>.jsonl.gz"""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f'notifications-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz'
+        self.file = gzip.open(self.path, 'at', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            row['created_at'] = row['created_at'].isoformat()
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def purge(batch_size=1000, archive_dir=None, pause=0, progress=None, now=None):
+    """
+    Xóa thông báo quá hạn, trả về số dòng đã xóa.
+    pause: nghỉ giữa các lô (giây) để không chiếm CSDL lâu.
+    """
+    archive = Archive(archive_dir) if archive_dir else None
+    deleted = 0
+    try:
+        for notification_type, cutoff in cutoffs(now).items():
+            expired = Notification.objects.filter(
+                notification_type=notification_type, created_at__lt=cutoff
+            ).order_by('created_at')
+            while True:
+                with transaction.atomic():
+                    rows = list(expired.values_list('pk', 'user_id')[:batch_size])
+                    if not rows:
+                        break
+                    batch = Notification.objects.filter(pk__in=[pk for pk, _ in rows])
+                    if archive:
+                        archive.write(batch.values(*ARCHIVE_FIELDS))
+                    # Không có bảng nào trỏ tới Notification: xóa thẳng, bỏ qua post_delete
+                    # (signals.reset_unread_count) để không xóa cache từng dòng khi đang giữ khóa
+                    deleted += batch._raw_delete(batch.db)
+                    user_ids = {user_id for _, user_id in rows}
+                    transaction.on_commit(lambda user_ids=user_ids: invalidate_unread_counts(user_ids))
+                if progress:
+                    progress(deleted)
+                if pause:
+                    time.sleep(pause)
+    finally:
+        if archive:
+            archive.close()
+    return deleted
+
+
+def purge_broadcasts(batch_size=1000, pause=0, now=None):
+    """
+    Xóa Broadcast quá hạn theo loại, trả về số dòng đã xóa.
+    BroadcastRead (một dòng cho mỗi người đã đọc) được xóa trước theo từng lô.
+    """
+    broadcasts = Broadcast.objects.filter(expired_filter(now)).exclude(status='running')
+    broadcast_ids = list(broadcasts.values_list('pk', flat=True))
+    if not broadcast_ids:
+        return 0
+    reads = BroadcastRead.objects.filter(broadcast_id__in=broadcast_ids).order_by('pk')
+    while True:
+        with transaction.atomic():
+            ids = list(reads.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            BroadcastRead.objects.filter(pk__in=ids).delete()
+        if pause:
+            time.sleep(pause)
+
+    broadcasts = Broadcast.objects.filter(pk__in=broadcast_ids)
+    shared = broadcasts.filter(mode='read').exists()
+    deleted = broadcasts.delete()[1].get(Broadcast._meta.label, 0)
+    if shared:
+        bump_broadcast_version()
+    return deleted
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import invalidate_unread_count
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def reset_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.user_id)
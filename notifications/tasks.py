@@ -0,0 +1,14 @@
+from outbox.queue import task
+from .broadcast import fan_out_chunk
+from .dispatch import notify
+
+
+@task('notifications.create')
+def create_notification(user_id, title, message, notification_type='system', link=''):
+    notify(user_id, title, message, notification_type=notification_type, link=link)
+
+
+@task('notifications.broadcast')
+def broadcast_notification(broadcast_id, after=0):
+    # Mỗi tác vụ gửi một lô rồi xếp lô kế tiếp (notifications/broadcast.py)
+    fan_out_chunk(broadcast_id, after)
@@ -1,25 +1,51 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.http import JsonResponse
 
+from products.pagination import CursorPaginator
+from .broadcast import mark_broadcasts_read, visible_broadcasts
+from .dispatch import push_unread_count
 from .models import Notification
 
+NOTIFICATION_ORDERING = ('-created_at', '-id')
+
 
 @login_required
 def notification_list_view(request):
+    """Danh sách thông báo, phân trang theo con trỏ (chỉ mục notif_user_created_idx)"""
     notifications = Notification.objects.filter(user=request.user)
-    return render(request, 'notifications/list.html', {'notifications': notifications})
+    cursor = request.GET.get('cursor')
+    page = CursorPaginator(notifications, NOTIFICATION_ORDERING, settings.NOTIFICATION_PAGE_SIZE).get_page(cursor)
+    context = {
+        'notifications': page,
+        'page_obj': page,
+        # Broadcast dùng chung chỉ có vài dòng (bị xóa theo thời hạn), hiện ở trang đầu
+        'broadcasts': visible_broadcasts(request.user) if not cursor else [],
+    }
+    return render(request, 'notifications/list.html', context)
 
 
 @login_required
 def mark_as_read_view(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    if not notification.is_read:
+        notification.is_read = True
+        notification.save()
+        push_unread_count(request.user.id)
+    return JsonResponse({'status': 'success'})
+
+
+@login_required
+def mark_broadcast_read_view(request, broadcast_id):
+    if mark_broadcasts_read(request.user, [broadcast_id]):
+        push_unread_count(request.user.id)
     return JsonResponse({'status': 'success'})
 
 
 @login_required
 def mark_all_read_view(request):
     Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    mark_broadcasts_read(request.user)
+    push_unread_count(request.user.id)
     return JsonResponse({'status': 'success'})
\ No newline at end of file
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.vietqr import image_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete cached VietQR images older than the given number of days '
+        '(web processes also prune in the background; schedule this daily for idle servers)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.VIETQR_CACHE_MAX_AGE_DAYS)
+    
+    def handle(self, *args, **options):
+        removed = image_cache.prune(options['days'] * 24 * 60 * 60)
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} cached QR images'))
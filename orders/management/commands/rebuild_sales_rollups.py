@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily/monthly sales rollup tables from existing orders'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        created = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups ({created} rows)'))
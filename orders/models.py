@@ -1,10 +1,8 @@
-import qrcode
-from io import BytesIO
-from django.core.files import File
 from django.db import models
 from accounts.models import User
-from products.models import Product
+from products.models import Category, Product
 from cart.models import Coupon
+from . import vietqr
 
 
 class PaymentMethod(models.Model):
@@ -19,11 +17,32 @@ class PaymentMethod(models.Model):
     bank_name = models.CharField(max_length=100, blank=True)
     bank_account = models.CharField(max_length=50, blank=True)
     bank_holder = models.CharField(max_length=100, blank=True)
+    bank_bin = models.CharField(max_length=6, blank=True, help_text='Mã BIN ngân hàng (NAPAS) cho VietQR')
     
     def __str__(self):
         return self.name
 
 
+class OrderQuerySet(models.QuerySet):
+    """Các cách nạp đơn hàng dùng chung cho trang khách và trang admin (tránh N+1)"""
+    
+    def with_items(self):
+        """Nạp sẵn order.items.all kèm item.product (1 truy vấn cho mọi đơn)"""
+        return self.prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.with_product())
+        )
+    
+    def for_listing(self):
+        """Danh sách đơn: kèm user, payment_method, số sản phẩm và số dòng"""
+        return self.select_related('user', 'payment_method').annotate(
+            item_count=models.Sum('items__quantity'),
+            line_count=models.Count('items'),
+        )
+    
+    def for_detail(self):
+        return self.select_related('user', 'payment_method', 'coupon').with_items()
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Chờ xác nhận'),
@@ -61,57 +80,57 @@ class Order(models.Model):
     
     total = models.DecimalField(max_digits=12, decimal_places=0, default=0, verbose_name='Tổng tiền')
     
-    # QR Code for payment
-    qr_code = models.ImageField(upload_to='qrcodes/', blank=True, null=True)
-    
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OrderQuerySet.as_manager()
+    
     def __str__(self):
         return f"Đơn hàng #{self.id} - {self.user.username}"
     
-    def generate_qr_code(self):
-        """Tạo QR code thanh toán"""
-        if self.payment_method and self.payment_method.bank_account:
-            # Tạo nội dung QR theo chuẩn VietQR
-            qr_data = f"""
-Bank: {self.payment_method.bank_name}
-Account: {self.payment_method.bank_account}
-Name: {self.payment_method.bank_holder}
-Amount: {self.total}
-Content: DH{self.id} - {self.full_name}
-            """.strip()
-            
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            
-            filename = f'order_{self.id}_qr.png'
-            self.qr_code.save(filename, File(buffer), save=False)
+    @property
+    def needs_payment_qr(self):
+        return bool(self.payment_method and self.payment_method.code == 'bank_transfer')
+    
+    @property
+    def payment_qr_available(self):
+        """Có ảnh QR tại order_payment_qr (phương thức chuyển khoản có BIN ngân hàng)"""
+        return vietqr.payment_qr_available(self)
+    
+    @property
+    def transfer_message(self):
+        """Nội dung chuyển khoản in trong mã VietQR"""
+        return vietqr.transfer_message(self)
     
     def save(self, *args, **kwargs):
         # Calculate total
         if not self.total:
             self.total = self.subtotal + self.shipping_fee - self.discount
-        
-        # Generate QR on first save for bank transfer
-        is_new = self.pk is None
         super().save(*args, **kwargs)
-        
-        if is_new and self.payment_method and self.payment_method.code == 'bank_transfer':
-            self.generate_qr_code()
-            super().save(update_fields=['qr_code'])
     
     class Meta:
         verbose_name = 'Đơn hàng'
         verbose_name_plural = 'Đơn hàng'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_product(self):
+        return self.select_related('product', 'product__category')
+    
+    def totals_by_product(self):
+        """{product_id: tổng số lượng} của các dòng trong queryset"""
+        return dict(
+            self.order_by().values('product_id').annotate(
+                total=models.Sum('quantity')
+            ).values_list('product_id', 'total')
+        )
 
 
 class OrderItem(models.Model):
@@ -120,6 +139,8 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=12, decimal_places=0)
     
+    objects = OrderItemQuerySet.as_manager()
+    
     @property
     def total_price(self):
         return self.price * self.quantity
@@ -129,4 +150,108 @@ class OrderItem(models.Model):
     
     class Meta:
         verbose_name = 'Chi tiết đơn hàng'
-        verbose_name_plural = 'Chi tiết đơn hàng'
\ No newline at end of file
+        verbose_name_plural = 'Chi tiết đơn hàng'
+
+
+class StockReservation(models.Model):
+    """Giữ hàng tạm thời trong lúc khách thanh toán (xem orders/reservations.py)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} cho {self.user_id} đến {self.expires_at}"
+    
+    class Meta:
+        verbose_name = 'Giữ hàng'
+        verbose_name_plural = 'Giữ hàng'
+        indexes = [
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+
+class StockHoldTotal(models.Model):
+    """
+    Tổng số lượng đang được giữ của một sản phẩm, tăng bằng UPDATE có điều kiện
+    (held + q <= stock) nên giữ hàng không cần khóa dòng Product (xem orders/reservations.py)
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='hold_total')
+    held = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.held} đang giữ của {self.product_id}"
+    
+    class Meta:
+        verbose_name = 'Tổng giữ hàng'
+        verbose_name_plural = 'Tổng giữ hàng'
+
+
+class SalesRollup(models.Model):
+    """
+    Số liệu bán hàng cộng dồn theo ngày/tháng và trạng thái đơn (xem orders/rollups.py).
+    Ngày là ngày tạo đơn theo TIME_ZONE; dòng 'month' có date là ngày đầu tháng.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Ngày'),
+        ('month', 'Tháng'),
+    ]
+    
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    units = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.period} {self.date} {self.status}: {self.order_count}"
+    
+    class Meta:
+        verbose_name = 'Tổng hợp doanh số'
+        verbose_name_plural = 'Tổng hợp doanh số'
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'date', 'status'], name='sales_rollup_unique'),
+        ]
+
+
+class ProductSalesRollup(models.Model):
+    """Doanh số theo sản phẩm của các đơn đã hoàn thành"""
+    period = models.CharField(max_length=5, choices=SalesRollup.PERIOD_CHOICES)
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_rollups')
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    units = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.period} {self.date} {self.product_id}: {self.units}"
+    
+    class Meta:
+        verbose_name = 'Doanh số sản phẩm'
+        verbose_name_plural = 'Doanh số sản phẩm'
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'date', 'product'], name='product_rollup_unique'),
+        ]
+
+
+class CategorySalesRollup(models.Model):
+    """Doanh số theo danh mục của các đơn đã hoàn thành"""
+    period = models.CharField(max_length=5, choices=SalesRollup.PERIOD_CHOICES)
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_rollups')
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    units = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.period} {self.date} {self.category_id}: {self.revenue}"
+    
+    class Meta:
+        verbose_name = 'Doanh số danh mục'
+        verbose_name_plural = 'Doanh số danh mục'
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'date', 'category'], name='category_rollup_unique'),
+        ]
@@ -0,0 +1,190 @@
+"""
+Báo cáo doanh số theo khoảng ngày cho trang thống kê admin.
+
+Ngày/tuần/tháng được tính trên các dòng 'day' của bảng tổng hợp (orders/rollups.py):
+một năm chỉ là ~365 dòng mỗi trạng thái, nên báo cáo bất kỳ khoảng nào cũng không
+quét bảng Order. Theo giờ thì đọc trực tiếp Order trong khoảng (chỉ mục status,
+created_at). Mọi mốc thời gian theo TIME_ZONE (Asia/Ho_Chi_Minh).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import CategorySalesRollup, Order, OrderItem, ProductSalesRollup, SalesRollup
+
+GRANULARITY_CHOICES = [
+    ('hour', 'Theo giờ'),
+    ('day', 'Theo ngày'),
+    ('week', 'Theo tuần'),
+    ('month', 'Theo tháng'),
+]
+
+# Giới hạn số điểm của báo cáo theo giờ
+MAX_HOURLY_DAYS = 31
+
+COMPLETED = 'completed'
+
+
+def _day_rows(model, start, end, **filters):
+    return model.objects.filter(period='day', date__gte=start, date__lte=end, **filters)
+
+
+def _local_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def period_start(value, granularity):
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def _periods(start, end, granularity):
+    """Tất cả các mốc trong khoảng, để điền 0 cho mốc không có đơn"""
+    if granularity == 'hour':
+        current, stop = _local_bounds(start, end)
+        while current < stop:
+            yield current
+            current += timedelta(hours=1)
+        return
+    current = period_start(start, granularity)
+    while current <= end:
+        yield current
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == 'week' else 1)
+
+
+def revenue_series(start, end, granularity='day'):
+    """[{'period', 'revenue', 'order_count', 'units'}] của đơn hoàn thành, đủ mọi mốc"""
+    if granularity == 'hour':
+        low, high = _local_bounds(start, end)
+        tz = timezone.get_current_timezone()
+        orders = Order.objects.filter(
+            status=COMPLETED, created_at__gte=low, created_at__lt=high
+        ).annotate(period=TruncHour('created_at', tzinfo=tz))
+        rows = orders.values('period').annotate(
+            revenue=Sum('total'), order_count=Count('id')
+        ).order_by()
+        units = {
+            row['period']: row['units']
+            for row in OrderItem.objects.filter(
+                order__status=COMPLETED, order__created_at__gte=low, order__created_at__lt=high
+            ).annotate(period=TruncHour('order__created_at', tzinfo=tz)).values('period').annotate(
+                units=Sum('quantity')
+            ).order_by()
+        }
+        by_period = {
+            row['period']: {**row, 'units': units.get(row['period'], 0)} for row in rows
+        }
+    else:
+        truncate = {'week': TruncWeek, 'month': TruncMonth}.get(granularity)
+        rows = _day_rows(SalesRollup, start, end, status=COMPLETED).annotate(
+            bucket=truncate('date') if truncate else F('date')
+        )
+        by_period = {
+            row['bucket']: row
+            for row in rows.values('bucket').annotate(
+                revenue=Sum('revenue'), order_count=Sum('order_count'), units=Sum('units')
+            ).order_by()
+        }
+
+    series = []
+    for period in _periods(start, end, granularity):
+        row = by_period.get(period, {})
+        series.append({
+            'period': period,
+            'revenue': row.get('revenue') or Decimal(0),
+            'order_count': row.get('order_count') or 0,
+            'units': row.get('units') or 0,
+        })
+    return series
+
+
+def summary(start, end):
+    """Tổng doanh thu, số đơn, số sản phẩm và giá trị đơn trung bình trong khoảng"""
+    row = _day_rows(SalesRollup, start, end, status=COMPLETED).aggregate(
+        revenue=Sum('revenue'), order_count=Sum('order_count'), units=Sum('units')
+    )
+    revenue = row['revenue'] or Decimal(0)
+    order_count = row['order_count'] or 0
+    return {
+        'revenue': revenue,
+        'order_count': order_count,
+        'units': row['units'] or 0,
+        'average_order_value': (revenue / order_count).quantize(Decimal(1)) if order_count else Decimal(0),
+    }
+
+
+def previous_range(start, end):
+    """Khoảng cùng độ dài ngay trước [start, end]"""
+    length = end - start + timedelta(days=1)
+    return start - length, start - timedelta(days=1)
+
+
+def percent_change(current, previous):
+    if not previous:
+        return None
+    return round(float((current - previous) / previous * 100), 1)
+
+
+def compare(current, previous):
+    return {
+        key: percent_change(current[key], previous[key])
+        for key in ('revenue', 'order_count', 'units', 'average_order_value')
+    }
+
+
+def top_products(start, end, limit=10):
+    return list(_day_rows(ProductSalesRollup, start, end).values('product__name').annotate(
+        total_sold=Sum('units'),
+        total_revenue=Sum('revenue')
+    ).order_by('-total_sold')[:limit])
+
+
+def revenue_by_category(start, end):
+    return [
+        {'product__category__name': row['category__name'], 'total': row['total']}
+        for row in _day_rows(CategorySalesRollup, start, end).values('category__name').annotate(
+            total=Sum('revenue')
+        ).order_by('-total')
+    ]
+
+
+def orders_by_status(start, end):
+    """Số đơn tạo trong khoảng theo trạng thái hiện tại"""
+    return list(_day_rows(SalesRollup, start, end).values('status').annotate(
+        count=Sum('order_count')
+    ).filter(count__gt=0).order_by('status'))
+
+
+def build_report(start, end, granularity='day', compare_previous=True):
+    current = summary(start, end)
+    report = {
+        'series': revenue_series(start, end, granularity),
+        'summary': current,
+        'top_products': top_products(start, end),
+        'revenue_by_category': revenue_by_category(start, end),
+        'orders_by_status': orders_by_status(start, end),
+    }
+    if compare_previous:
+        previous_start, previous_end = previous_range(start, end)
+        previous = summary(previous_start, previous_end)
+        report.update({
+            'previous_start': previous_start,
+            'previous_end': previous_end,
+            'previous_summary': previous,
+            'changes': compare(current, previous),
+            'previous_series': revenue_series(previous_start, previous_end, granularity),
+        })
+    return report
@@ -0,0 +1,159 @@
+"""
+Giữ hàng (stock hold) có thời hạn cho sản phẩm được tranh mua.
+
+Khi khách mở trang thanh toán, mỗi dòng trong giỏ được giữ STOCK_HOLD_SECONDS giây.
+Số lượng có thể bán = tồn kho - tổng các lượt giữ còn hạn của người khác.
+
+Mỗi sản phẩm có một dòng đếm StockHoldTotal.held (tổng đang giữ). Giữ hàng là một câu
+UPDATE có điều kiện trên dòng đếm (held = held + q WHERE held + q <= stock), nên hai lượt
+thanh toán đồng thời không cùng vượt qua bước kiểm tra mà không phải khóa dòng Product.
+Lượt giữ hết hạn vẫn nằm trong held cho tới khi được dọn: khi không giữ được, các lượt
+hết hạn của sản phẩm đó được trả lại rồi thử thêm một lần. Mở lại trang thanh toán chỉ
+gia hạn lượt giữ đã có. Lệnh release_expired_holds dọn bảng định kỳ.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockHoldTotal, StockReservation
+
+
+def active_reservations():
+    return StockReservation.objects.filter(expires_at__gt=timezone.now())
+
+
+def held_by_others(user, product_ref=OuterRef('pk')):
+    """Subquery: tổng số lượng đang được người khác giữ cho một sản phẩm"""
+    holds = active_reservations().filter(product=product_ref)
+    if user is not None:
+        holds = holds.exclude(user=user)
+    return Coalesce(
+        Subquery(holds.values('product').annotate(total=Sum('quantity')).values('total')[:1]),
+        0,
+    )
+
+
+def available_to_sell(product_ids, user=None):
+    """{product_id: tồn kho - số lượng người khác đang giữ}"""
+    rows = Product.objects.filter(pk__in=product_ids).annotate(
+        held=held_by_others(user)
+    ).values_list('pk', 'stock', 'held')
+    return {pk: max(stock - held, 0) for pk, stock, held in rows}
+
+
+def _add_held(product_id, quantity):
+    """Tăng held nếu còn đủ hàng (quantity > 0) hoặc giảm held; trả về False nếu không đủ"""
+    counter = StockHoldTotal.objects.filter(pk=product_id)
+    if quantity <= 0:
+        counter.update(held=Greatest(F('held') + quantity, 0))
+        return True
+    stock = Subquery(Product.objects.filter(pk=OuterRef('pk')).values('stock')[:1])
+    return bool(counter.filter(held__lte=stock - quantity).update(held=F('held') + quantity))
+
+
+def _release(reservations):
+    """Xóa các lượt giữ và trừ chúng khỏi held, trả về số lượt đã xóa"""
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Hai tiến trình cùng dọn không trừ một lượt giữ hai lần
+            reservations = reservations.select_for_update(skip_locked=True)
+        rows = list(reservations.values_list('pk', 'product_id', 'quantity'))
+        if not rows:
+            return 0
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        released = defaultdict(int)
+        for _, product_id, quantity in rows:
+            released[product_id] += quantity
+        for product_id, quantity in sorted(released.items()):
+            _add_held(product_id, -quantity)
+    return len(rows)
+
+
+def _try_hold(user, wanted, expires_at):
+    """Giữ tất cả hoặc không giữ gì; trả về các product_id không đủ hàng"""
+    with transaction.atomic():
+        existing = dict(
+            StockReservation.objects.filter(user=user, product_id__in=wanted).values_list('product_id', 'quantity')
+        )
+        # Theo thứ tự id để các lượt giữ đồng thời khóa dòng đếm cùng thứ tự (tránh deadlock)
+        failed = [
+            product_id for product_id in sorted(wanted)
+            if not _add_held(product_id, wanted[product_id] - existing.get(product_id, 0))
+        ]
+        if failed:
+            transaction.set_rollback(True)
+            return failed
+
+        # Lượt giữ đã có chỉ được gia hạn (và sửa số lượng nếu đổi)
+        for product_id, quantity in existing.items():
+            StockReservation.objects.filter(user=user, product_id=product_id).update(
+                quantity=wanted[product_id], expires_at=expires_at
+            )
+        StockReservation.objects.bulk_create([
+            StockReservation(product_id=product_id, user=user, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in wanted.items()
+            if product_id not in existing
+        ])
+    return []
+
+
+def hold_stock(user, lines):
+    """
+    Giữ hàng cho các dòng (product, quantity); lượt giữ của user cho sản phẩm khác không đổi.
+
+    Trả về danh sách (product, quantity, available) của các dòng không giữ được;
+    khi đó các lượt giữ của user cho các sản phẩm trong lines được bỏ.
+    """
+    if not lines:
+        return []
+    wanted = defaultdict(int)
+    for product, quantity in lines:
+        wanted[product.pk] += quantity
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_HOLD_SECONDS)
+    StockHoldTotal.objects.bulk_create(
+        [StockHoldTotal(product_id=product_id) for product_id in wanted], ignore_conflicts=True
+    )
+
+    failed = _try_hold(user, wanted, expires_at)
+    if failed:
+        # held còn tính các lượt giữ đã hết hạn: trả lại chúng rồi thử lại một lần
+        _release(StockReservation.objects.filter(product_id__in=failed, expires_at__lte=timezone.now()))
+        failed = _try_hold(user, wanted, expires_at)
+    if not failed:
+        return []
+
+    release_holds(user, list(wanted))
+    available = available_to_sell(failed, user=user)
+    return [
+        (product, quantity, available.get(product.pk, 0))
+        for product, quantity in lines
+        if product.pk in available
+    ]
+
+
+def release_holds(user, product_ids):
+    """Bỏ lượt giữ của user cho các sản phẩm này"""
+    return _release(StockReservation.objects.filter(user=user, product_id__in=product_ids))
+
+
+def release_expired(batch_size=1000):
+    """Xóa các lượt giữ đã hết hạn theo lô nhỏ, trả về số dòng đã xóa"""
+    total = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        released = _release(StockReservation.objects.filter(pk__in=ids, expires_at__lte=timezone.now()))
+        if not released:
+            # Các dòng còn lại đang được tiến trình khác dọn
+            return total
+        total += released
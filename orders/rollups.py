@@ -0,0 +1,155 @@
+"""
+Bảng tổng hợp doanh số cho dashboard/thống kê admin.
+
+Mỗi lần đơn hàng được tạo hoặc đổi trạng thái, record_transition() trừ số liệu của đơn
+khỏi trạng thái cũ và cộng vào trạng thái mới (UPDATE ... SET x = x + delta), trên cả
+dòng ngày và dòng tháng. Doanh số theo sản phẩm/danh mục chỉ tính đơn 'completed'.
+Các view chỉ đọc các bảng này nên thời gian tải không tăng theo số đơn hàng.
+Dữ liệu cũ: python manage.py rebuild_sales_rollups
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CategorySalesRollup, Order, OrderItem, ProductSalesRollup, SalesRollup
+
+COMPLETED = 'completed'
+
+
+def period_dates(day):
+    return (('day', day), ('month', day.replace(day=1)))
+
+
+def _bump(model, lookup, order_count, revenue, units):
+    changes = {
+        'order_count': F('order_count') + order_count,
+        'revenue': F('revenue') + revenue,
+        'units': F('units') + units,
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, order_count=order_count, revenue=revenue, units=units)
+    except IntegrityError:
+        # Dòng vừa được transaction khác tạo
+        model.objects.filter(**lookup).update(**changes)
+
+
+def order_lines(order):
+    return list(OrderItem.objects.filter(order=order).values(
+        'product_id', 'quantity', 'price', category_id=F('product__category_id')
+    ))
+
+
+def record_transition(order, old_status, new_status, lines=None):
+    """
+    Cập nhật bảng tổng hợp khi đơn chuyển old_status -> new_status
+    (old_status=None khi đơn vừa tạo). Gọi trong transaction của thay đổi trạng thái.
+    lines: các dict product_id, category_id, quantity, price (mặc định đọc từ CSDL).
+    """
+    if old_status == new_status:
+        return
+    if lines is None:
+        lines = order_lines(order)
+    units = sum(line['quantity'] for line in lines)
+    day = timezone.localdate(order.created_at)
+
+    sign = (new_status == COMPLETED) - (old_status == COMPLETED)
+    by_product = defaultdict(lambda: [0, Decimal(0)])
+    by_category = defaultdict(lambda: [0, Decimal(0)])
+    if sign:
+        for line in lines:
+            for key, totals in ((line['product_id'], by_product), (line['category_id'], by_category)):
+                totals[key][0] += line['quantity']
+                totals[key][1] += line['price'] * line['quantity']
+
+    for period, date in period_dates(day):
+        if old_status:
+            _bump(SalesRollup, {'period': period, 'date': date, 'status': old_status},
+                  -1, -order.total, -units)
+        if new_status:
+            _bump(SalesRollup, {'period': period, 'date': date, 'status': new_status},
+                  1, order.total, units)
+        for product_id, (quantity, revenue) in by_product.items():
+            _bump(ProductSalesRollup, {'period': period, 'date': date, 'product_id': product_id},
+                  sign, sign * revenue, sign * quantity)
+        for category_id, (quantity, revenue) in by_category.items():
+            _bump(CategorySalesRollup, {'period': period, 'date': date, 'category_id': category_id},
+                  sign, sign * revenue, sign * quantity)
+
+
+def _with_months(rows, key_fields):
+    """Thêm dòng 'month' bằng cách cộng các dòng 'day'"""
+    months = {}
+    for row in rows:
+        key = (row['date'].replace(day=1),) + tuple(row[field] for field in key_fields)
+        month = months.setdefault(key, {
+            'period': 'month', 'date': key[0],
+            **{field: row[field] for field in key_fields},
+            'order_count': 0, 'revenue': Decimal(0), 'units': 0,
+        })
+        for field in ('order_count', 'revenue', 'units'):
+            month[field] += row[field]
+    return [{'period': 'day', **row} for row in rows] + list(months.values())
+
+
+def rebuild(batch_size=1000):
+    """Tính lại toàn bộ bảng tổng hợp từ Order/OrderItem, trả về số dòng đã tạo"""
+    units = {
+        (row['date'], row['order__status']): row['units']
+        for row in OrderItem.objects.annotate(date=TruncDate('order__created_at')).values(
+            'date', 'order__status'
+        ).annotate(units=Sum('quantity')).order_by()
+    }
+    status_rows = [
+        {
+            'date': row['date'],
+            'status': row['status'],
+            'order_count': row['order_count'],
+            'revenue': row['revenue'] or 0,
+            'units': units.get((row['date'], row['status']), 0),
+        }
+        for row in Order.objects.annotate(date=TruncDate('created_at')).values(
+            'date', 'status'
+        ).annotate(order_count=Count('id'), revenue=Sum('total')).order_by()
+    ]
+
+    completed_items = OrderItem.objects.filter(order__status=COMPLETED).annotate(
+        date=TruncDate('order__created_at')
+    )
+
+    def item_rows(field, key):
+        return [
+            {
+                'date': row['date'],
+                key: row[field],
+                'order_count': row['order_count'],
+                'revenue': row['revenue'],
+                'units': row['units'],
+            }
+            for row in completed_items.values('date', field).annotate(
+                order_count=Count('order_id', distinct=True),
+                revenue=Sum(F('price') * F('quantity')),
+                units=Sum('quantity'),
+            ).order_by()
+        ]
+
+    tables = [
+        (SalesRollup, _with_months(status_rows, ['status'])),
+        (ProductSalesRollup, _with_months(item_rows('product_id', 'product_id'), ['product_id'])),
+        (CategorySalesRollup, _with_months(
+            item_rows('product__category_id', 'category_id'), ['category_id']
+        )),
+    ]
+    created = 0
+    with transaction.atomic():
+        for model, rows in tables:
+            model.objects.all().delete()
+            model.objects.bulk_create([model(**row) for row in rows], batch_size=batch_size)
+            created += len(rows)
+    return created
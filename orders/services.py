@@ -0,0 +1,172 @@
+"""
+Đặt hàng trong một transaction duy nhất.
+
+- Trừ tồn kho bằng UPDATE có điều kiện (stock >= số lượng + số lượng người khác đang
+  giữ) nên không bán quá số lượng khi nhiều người mua cùng lúc, không cần đọc-sửa-ghi
+  trên từng Product. Lượt giữ hàng của người mua cho các sản phẩm trong đơn được xóa khi
+  đặt hàng thành công.
+- OrderItem được tạo bằng bulk_create.
+- Lượt dùng mã giảm giá được tăng bằng UPDATE có điều kiện (used_count < usage_limit).
+- Bảng tổng hợp doanh số (orders/rollups.py) được cập nhật khi tạo đơn và khi đổi
+  trạng thái (change_order_status).
+- Email xác nhận và thông báo được ghi vào outbox trong cùng transaction
+  và xử lý sau bởi worker, không nằm trên đường phản hồi của request.
+Bất kỳ dòng nào hết hàng -> rollback toàn bộ và báo lỗi cho từng dòng.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from cart.models import Coupon
+from outbox.queue import enqueue
+from products import home_cache
+from products.models import Product
+from .models import Order, OrderItem
+from .rollups import record_transition
+from .reservations import available_to_sell, held_by_others, release_holds
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStockError(CheckoutError):
+    def __init__(self, failures):
+        # failures: danh sách (product, số lượng yêu cầu, tồn kho hiện có)
+        self.failures = failures
+        super().__init__(', '.join(
+            f'{product.name}: chỉ còn {available} sản phẩm' for product, _, available in failures
+        ))
+
+
+class CouponUnavailableError(CheckoutError):
+    def __init__(self, coupon):
+        self.coupon = coupon
+        super().__init__(f'Mã giảm giá {coupon.code} không còn hiệu lực!')
+
+
+def redeem_coupon(coupon):
+    now = timezone.now()
+    updated = Coupon.objects.filter(
+        pk=coupon.pk,
+        is_active=True,
+        valid_from__lte=now,
+        valid_to__gte=now,
+        used_count__lt=F('usage_limit'),
+    ).update(used_count=F('used_count') + 1)
+    if not updated:
+        raise CouponUnavailableError(coupon)
+
+
+def reserve_stock(lines, user=None):
+    """Trừ tồn kho cho từng dòng, trả về danh sách dòng không đủ hàng"""
+    failed = []
+    # Sắp theo id để các transaction đồng thời khóa dòng theo cùng thứ tự (tránh deadlock)
+    for product, quantity, _ in sorted(lines, key=lambda line: line[0].pk):
+        updated = Product.objects.filter(
+            pk=product.pk,
+            stock__gte=quantity + held_by_others(user, product_ref=product.pk),
+        ).update(
+            stock=F('stock') - quantity,
+            sold_count=F('sold_count') + quantity,
+        )
+        if not updated:
+            failed.append((product, quantity))
+    if not failed:
+        return []
+    available = available_to_sell([product.pk for product, _ in failed], user=user)
+    return [(product, quantity, available.get(product.pk, 0)) for product, quantity in failed]
+
+
+def place_order(order, lines, coupon=None):
+    """
+    Lưu đơn hàng cùng các dòng sản phẩm.
+
+    lines: danh sách (product, quantity, price).
+    Raise OutOfStockError / CouponUnavailableError, khi đó không có gì được ghi.
+    """
+    with transaction.atomic():
+        if coupon is not None:
+            redeem_coupon(coupon)
+            order.coupon = coupon
+
+        failures = reserve_stock(lines, user=order.user)
+        if failures:
+            raise OutOfStockError(failures)
+        release_holds(order.user, [product.pk for product, _, _ in lines])
+
+        order.save()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity, price=price)
+            for product, quantity, price in lines
+        ])
+        record_transition(order, None, order.status, lines=[
+            {'product_id': product.pk, 'category_id': product.category_id,
+             'quantity': quantity, 'price': price}
+            for product, quantity, price in lines
+        ])
+        enqueue_order_side_effects(order)
+        product_ids = [product.pk for product, _, _ in lines]
+        transaction.on_commit(lambda: home_cache.invalidate_products(product_ids, sold_changed=True))
+    return order
+
+
+def change_order_status(order, new_status):
+    """
+    Đổi trạng thái đơn bằng UPDATE có điều kiện trên trạng thái hiện tại, để hai thao tác
+    đồng thời không cùng áp dụng một chuyển trạng thái. Trả về False nếu đơn đã bị đổi
+    trạng thái bởi nơi khác.
+    """
+    old_status = order.status
+    if new_status == old_status:
+        return True
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=old_status).update(
+            status=new_status, updated_at=timezone.now()
+        )
+        if not updated:
+            return False
+        record_transition(order, old_status, new_status)
+    order.status = new_status
+    return True
+
+
+def enqueue_order_side_effects(order):
+    enqueue(
+        'notifications.create',
+        user_id=order.user_id,
+        title='Đặt hàng thành công!',
+        message=f'Đơn hàng #{order.id} đã được tạo. Tổng tiền: {order.total:,.0f}đ',
+        notification_type='order',
+        link=f'/orders/detail/{order.id}/',
+    )
+    enqueue('orders.send_confirmation_email', order_id=order.id)
+
+
+def restore_stock(quantities):
+    """Cộng lại tồn kho cho {product_id: số lượng} bằng một câu UPDATE duy nhất"""
+    if not quantities:
+        return 0
+
+    def per_product():
+        return Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    product_ids = list(quantities)
+    transaction.on_commit(lambda: home_cache.invalidate_products(product_ids, sold_changed=True))
+    return Product.objects.filter(pk__in=product_ids).update(
+        stock=F('stock') + per_product(),
+        sold_count=F('sold_count') - per_product(),
+    )
+
+
+def cancel_order(order):
+    """Hủy đơn và hoàn tồn kho trong cùng transaction, False nếu đơn đã đổi trạng thái"""
+    with transaction.atomic():
+        if not change_order_status(order, 'cancelled'):
+            return False
+        restore_stock(OrderItem.objects.filter(order=order).totals_by_product())
+    return True
@@ -0,0 +1,33 @@
+"""Tác vụ phụ của đơn hàng, chạy bởi outbox worker (python manage.py run_outbox_worker)"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from outbox.queue import task
+from .models import Order
+
+
+@task('orders.send_confirmation_email')
+def send_confirmation_email(order_id):
+    order = Order.objects.select_related('payment_method').get(pk=order_id)
+    payment_method = order.payment_method.name if order.payment_method else ''
+    send_mail(
+        subject=f'Xác nhận đơn hàng #{order.id} - Phone Accessories Shop',
+        message=f'''
+Xin chào {order.full_name},
+
+Đơn hàng #{order.id} của bạn đã được tạo thành công!
+
+Chi tiết đơn hàng:
+- Tổng tiền: {order.total:,.0f}đ
+- Phương thức thanh toán: {payment_method}
+- Địa chỉ giao hàng: {order.address}
+
+Chúng tôi sẽ liên hệ với bạn sớm nhất.
+
+Trân trọng,
+Phone Accessories Shop
+        ''',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.email],
+    )
+
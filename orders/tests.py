@@ -0,0 +1,83 @@
+"""
+Giới hạn số truy vấn của trang đơn hàng (không phụ thuộc số đơn / số sản phẩm).
+
+render() được thay bằng hàm duyệt context giống template (đơn -> dòng -> sản phẩm ->
+danh mục), nên truy vấn lười trong template cũng được đếm. Session lưu trong DB để số
+truy vấn không phụ thuộc cache.
+"""
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from products.models import Category, Product
+from .models import Order, OrderItem, PaymentMethod
+
+TEST_SETTINGS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'CACHES': {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in ('default', 'catalog', 'sessions')
+    },
+}
+
+
+def walk_orders(orders):
+    """Đọc mọi thuộc tính template đơn hàng dùng"""
+    for order in orders:
+        str(order.user)
+        str(order.payment_method)
+        for item in order.items.all():
+            str(item.product.category)
+            item.total_price
+
+
+def render_orders(request, template_name, context=None):
+    context = context or {}
+    walk_orders(context['orders'] if 'orders' in context else [context['order']])
+    return HttpResponse()
+
+
+def create_orders(user, count=3, lines=3):
+    category = Category.objects.create(name='Điện thoại', slug='dien-thoai')
+    products = [
+        Product.objects.create(name=f'Sản phẩm {i}', slug=f'san-pham-{i}', category=category, price=1000)
+        for i in range(lines)
+    ]
+    payment_method = PaymentMethod.objects.create(name='COD', code='cod')
+    orders = []
+    for _ in range(count):
+        order = Order.objects.create(
+            user=user, full_name='Nguyễn Văn A', phone='0900000000', email=user.email,
+            address='Hà Nội', payment_method=payment_method, subtotal=1000 * lines,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for product in products
+        ])
+        orders.append(order)
+    return orders
+
+
+@override_settings(**TEST_SETTINGS)
+@mock.patch('orders.views.render', render_orders)
+class OrderQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.orders = create_orders(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_order_history(self):
+        # session, user, đơn hàng, dòng đơn + sản phẩm + danh mục
+        with self.assertNumQueries(4):
+            response = self.client.get('/orders/history/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_order_detail(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/orders/detail/{self.orders[0].id}/')
+        self.assertEqual(response.status_code, 200)
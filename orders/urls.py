@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('checkout/', views.checkout_view, name='checkout'),
     path('success/<int:order_id>/', views.order_success_view, name='order_success'),
+    path('qr/<int:order_id>/', views.order_payment_qr_view, name='order_payment_qr'),
     path('history/', views.order_history_view, name='order_history'),
     path('detail/<int:order_id>/', views.order_detail_view, name='order_detail'),
     path('cancel/<int:order_id>/', views.cancel_order_view, name='cancel_order'),
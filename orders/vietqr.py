@@ -0,0 +1,217 @@
+"""
+Mã QR chuyển khoản theo chuẩn VietQR (NAPAS, dựa trên EMVCo Merchant-Presented QR).
+
+Payload dạng TLV: mỗi trường = ID (2 số) + độ dài (2 số) + giá trị, kết thúc bằng
+CRC-16/CCITT-FALSE (trường 63). Ảnh được vẽ khi có request (orders/views.py) và cache
+theo hash của nội dung: LRU trong bộ nhớ tiến trình + file trên đĩa (VIETQR_CACHE_DIR),
+nên đặt hàng không còn phải encode ảnh hay ghi file.
+
+Mỗi đơn hàng thêm một file vào cache đĩa. File cũ hơn VIETQR_CACHE_MAX_AGE_DAYS được dọn
+tự động ở luồng nền (tối đa mỗi VIETQR_CACHE_PRUNE_INTERVAL giây một lần mỗi tiến trình,
+khi có file mới), hoặc chạy tay/cron: python manage.py prune_qr_cache
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+NAPAS_GUID = 'A000000727'
+SERVICE_TO_ACCOUNT = 'QRIBFTTA'
+CURRENCY_VND = '704'
+COUNTRY_VN = 'VN'
+MAX_MESSAGE_LENGTH = 25
+
+MEMORY_CACHE_SIZE = 256
+
+# Mã BIN (NAPAS) của một số ngân hàng, dùng khi PaymentMethod chưa khai báo bank_bin
+BANK_BINS = {
+    'vietcombank': '970436',
+    'vietinbank': '970415',
+    'bidv': '970418',
+    'agribank': '970405',
+    'techcombank': '970407',
+    'mbbank': '970422',
+    'mb': '970422',
+    'acb': '970416',
+    'vpbank': '970432',
+    'tpbank': '970423',
+    'sacombank': '970403',
+}
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def _tlv(tag, value):
+    return f'{tag}{len(value):02d}{value}'
+
+
+def crc16_ccitt(data):
+    """CRC-16/CCITT-FALSE (đa thức 0x1021, giá trị đầu 0xFFFF)"""
+    crc = 0xFFFF
+    for byte in data.encode('utf-8'):
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return f'{crc:04X}'
+
+
+def clean_message(text):
+    """Nội dung chuyển khoản: bỏ dấu, chỉ giữ chữ/số/khoảng trắng, tối đa 25 ký tự"""
+    text = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = ''.join(ch if ch.isascii() and ch.isalnum() else ' ' for ch in text)
+    return ' '.join(text.split()).upper()[:MAX_MESSAGE_LENGTH].strip()
+
+
+def build_payload(bank_bin, account, amount=None, message=''):
+    """Chuỗi VietQR chuyển khoản tới tài khoản (có số tiền -> QR động)"""
+    beneficiary = _tlv('00', bank_bin) + _tlv('01', account)
+    merchant_account = (
+        _tlv('00', NAPAS_GUID)
+        + _tlv('01', beneficiary)
+        + _tlv('02', SERVICE_TO_ACCOUNT)
+    )
+    payload = _tlv('00', '01') + _tlv('01', '12' if amount else '11')
+    payload += _tlv('38', merchant_account)
+    payload += _tlv('53', CURRENCY_VND)
+    if amount:
+        payload += _tlv('54', str(int(amount)))
+    payload += _tlv('58', COUNTRY_VN)
+    message = clean_message(message)
+    if message:
+        payload += _tlv('62', _tlv('08', message))
+    payload += '6304'
+    return payload + crc16_ccitt(payload)
+
+
+def bank_bin_for(payment_method):
+    if payment_method.bank_bin:
+        return payment_method.bank_bin
+    name = ''.join(payment_method.bank_name.lower().split())
+    return BANK_BINS.get(name, '')
+
+
+def transfer_message(order):
+    return clean_message(f'DH{order.id} {order.full_name}')
+
+
+def payment_qr_available(order):
+    """Đơn hàng có mã QR hay không (cùng điều kiện với order_payload)"""
+    method = order.payment_method
+    return bool(order.needs_payment_qr and method.bank_account and bank_bin_for(method))
+
+
+def order_payload(order):
+    """Payload VietQR của đơn hàng, None nếu phương thức thanh toán không hỗ trợ"""
+    if not payment_qr_available(order):
+        return None
+    method = order.payment_method
+    return build_payload(bank_bin_for(method), method.bank_account, order.total, transfer_message(order))
+
+
+def content_hash(payload, fmt):
+    return hashlib.sha256(f'{fmt}:{payload}'.encode('utf-8')).hexdigest()
+
+
+def _encode(payload, fmt):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color='black', back_color='white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ImageCache:
+    """LRU trong bộ nhớ trước, sau đó tới file trên đĩa, cuối cùng mới encode ảnh"""
+
+    def __init__(self, size=MEMORY_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    @property
+    def directory(self):
+        return Path(settings.VIETQR_CACHE_DIR)
+
+    def _path(self, key, fmt):
+        return self.directory / key[:2] / f'{key}.{fmt}'
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def get(self, payload, fmt):
+        key = content_hash(payload, fmt)
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                return key, data
+
+        path = self._path(key, fmt)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = _encode(payload, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(path)
+            self._schedule_prune()
+        self._remember(key, data)
+        return key, data
+
+    def _schedule_prune(self):
+        """Dọn file cũ ở luồng nền, không chạy trên request"""
+        now = time.monotonic()
+        with self._lock:
+            if self._pruned_at and now - self._pruned_at < settings.VIETQR_CACHE_PRUNE_INTERVAL:
+                return
+            self._pruned_at = now
+        max_age = settings.VIETQR_CACHE_MAX_AGE_DAYS * 24 * 60 * 60
+        threading.Thread(target=self.prune, args=(max_age,), daemon=True).start()
+
+    def prune(self, max_age_seconds):
+        """Xóa file cache cũ hơn max_age_seconds, trả về số file đã xóa"""
+        if not self.directory.exists():
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.directory.glob('*/*'):
+            try:
+                expired = path.stat().st_mtime < cutoff
+            except OSError:
+                continue
+            if expired:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+image_cache = ImageCache()
+
+
+def render(payload, fmt='png'):
+    """Trả về (etag, bytes ảnh)"""
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f'Unsupported QR format: {fmt}')
+    return image_cache.get(payload, fmt)
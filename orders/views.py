@@ -1,16 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.core.mail import send_mail
-from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
 
 from cart.cart import Cart
 from cart.models import Coupon
 from products.models import Product
-from .models import Order, OrderItem, PaymentMethod
+from .models import Order, PaymentMethod
 from .forms import OrderCreateForm
-from notifications.models import Notification
+from .reservations import available_to_sell, hold_stock
+from .services import CheckoutError, OutOfStockError, cancel_order, place_order
+from . import vietqr
+from notifications.dispatch import notify
 
 
 @login_required
@@ -31,6 +33,8 @@ def checkout_view(request):
             coupon = Coupon.objects.get(code=coupon_code)
             if coupon.is_valid():
                 discount = coupon.calculate_discount(cart.get_total_price())
+            else:
+                coupon = None
         except Coupon.DoesNotExist:
             pass
     
@@ -42,66 +46,30 @@ def checkout_view(request):
             order.subtotal = cart.get_total_price()
             order.shipping_fee = 30000  # Fixed shipping fee
             order.discount = discount
-            if coupon:
-                order.coupon = coupon
-                coupon.used_count += 1
-                coupon.save()
             order.total = order.subtotal + order.shipping_fee - order.discount
-            order.save()
             
-            # Create order items
-            for item in cart:
-                product = item['product']
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=item['quantity'],
-                    price=item['price']
-                )
-                # Update stock
-                product.stock -= item['quantity']
-                product.sold_count += item['quantity']
-                product.save()
+            # Lưu đơn, trừ tồn kho và dùng mã giảm giá trong một transaction
+            lines = [(item['product'], item['quantity'], item['price']) for item in cart]
+            try:
+                place_order(order, lines, coupon=coupon)
+            except CheckoutError as e:
+                messages.error(request, str(e))
+                return redirect('cart_detail')
             
             # Clear cart and coupon
             cart.clear()
             if 'coupon_code' in request.session:
                 del request.session['coupon_code']
             
-            # Create notification
-            Notification.objects.create(
-                user=request.user,
-                title='Đặt hàng thành công!',
-                message=f'Đơn hàng #{order.id} đã được tạo. Tổng tiền: {order.total:,.0f}đ',
-                notification_type='order'
-            )
-            
-            # Send confirmation email
-            send_mail(
-                subject=f'Xác nhận đơn hàng #{order.id} - Phone Accessories Shop',
-                message=f'''
-Xin chào {order.full_name},
-
-Đơn hàng #{order.id} của bạn đã được tạo thành công!
-
-Chi tiết đơn hàng:
-- Tổng tiền: {order.total:,.0f}đ
-- Phương thức thanh toán: {order.payment_method.name}
-- Địa chỉ giao hàng: {order.address}
-
-Chúng tôi sẽ liên hệ với bạn sớm nhất.
-
-Trân trọng,
-Phone Accessories Shop
-                ''',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[order.email],
-                fail_silently=True,
-            )
-            
             messages.success(request, 'Đặt hàng thành công!')
             return redirect('order_success', order_id=order.id)
     else:
+        # Giữ hàng trong lúc khách điền thông tin thanh toán
+        failures = hold_stock(request.user, [(item['product'], item['quantity']) for item in cart])
+        if failures:
+            messages.error(request, str(OutOfStockError(failures)))
+            return redirect('cart_detail')
+        
         # Pre-fill form with user data
         initial = {
             'full_name': request.user.get_full_name() or request.user.username,
@@ -127,21 +95,43 @@ Phone Accessories Shop
 @login_required
 def order_success_view(request, order_id):
     """Trang đặt hàng thành công"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(Order.objects.for_detail(), id=order_id, user=request.user)
     return render(request, 'orders/order_success.html', {'order': order})
 
 
+@login_required
+def order_payment_qr_view(request, order_id):
+    """Ảnh VietQR chuyển khoản của đơn hàng (?format=svg cho ảnh vector)"""
+    order = get_object_or_404(Order.objects.select_related('payment_method'), id=order_id)
+    if order.user_id != request.user.id and not request.user.is_admin:
+        raise Http404
+    payload = vietqr.order_payload(order)
+    fmt = request.GET.get('format', 'png')
+    if payload is None or fmt not in vietqr.CONTENT_TYPES:
+        raise Http404
+    
+    etag = f'"{vietqr.content_hash(payload, fmt)}"'
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        _, data = vietqr.render(payload, fmt)
+        response = HttpResponse(data, content_type=vietqr.CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24)
+    return response
+
+
 @login_required
 def order_history_view(request):
     """Lịch sử đơn hàng"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    orders = Order.objects.filter(user=request.user).for_listing().with_items().order_by('-created_at')
     return render(request, 'orders/order_history.html', {'orders': orders})
 
 
 @login_required
 def order_detail_view(request, order_id):
     """Chi tiết đơn hàng"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(Order.objects.for_detail(), id=order_id, user=request.user)
     return render(request, 'orders/order_detail.html', {'order': order})
 
 
@@ -154,20 +144,15 @@ def cancel_order_view(request, order_id):
         messages.error(request, 'Không thể hủy đơn hàng ở trạng thái này!')
         return redirect('order_detail', order_id=order.id)
     
-    # Restore stock
-    for item in order.items.all():
-        item.product.stock += item.quantity
-        item.product.sold_count -= item.quantity
-        item.product.save()
-    
-    order.status = 'cancelled'
-    order.save()
+    if not cancel_order(order):
+        messages.error(request, 'Không thể hủy đơn hàng ở trạng thái này!')
+        return redirect('order_detail', order_id=order.id)
     
-    Notification.objects.create(
-        user=request.user,
+    notify(
+        request.user.id,
         title='Đơn hàng đã hủy',
         message=f'Đơn hàng #{order.id} đã được hủy thành công.',
-        notification_type='order'
+        notification_type='order',
     )
     
     messages.info(request, 'Đã hủy đơn hàng!')
@@ -180,8 +165,9 @@ def buy_now_view(request, product_id):
     product = get_object_or_404(Product, id=product_id, is_active=True)
     quantity = int(request.POST.get('quantity', 1))
     
-    if quantity > product.stock:
-        messages.error(request, f'Chỉ còn {product.stock} sản phẩm trong kho!')
+    available = available_to_sell([product.id], user=request.user)[product.id]
+    if quantity > available:
+        messages.error(request, f'Chỉ còn {available} sản phẩm trong kho!')
         return redirect('product_detail', slug=product.slug)
     
     # Store in session for checkout
@@ -216,34 +202,24 @@ def buy_now_checkout_view(request):
             order.subtotal = subtotal
             order.shipping_fee = shipping_fee
             order.total = total
-            order.save()
             
-            # Create order item
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=price
-            )
-            
-            # Update stock
-            product.stock -= quantity
-            product.sold_count += quantity
-            product.save()
+            try:
+                place_order(order, [(product, quantity, price)])
+            except CheckoutError as e:
+                messages.error(request, str(e))
+                return redirect('product_detail', slug=product.slug)
             
             # Clear session
             del request.session['buy_now']
             
-            Notification.objects.create(
-                user=request.user,
-                title='Đặt hàng thành công!',
-                message=f'Đơn hàng #{order.id} đã được tạo.',
-                notification_type='order'
-            )
-            
             messages.success(request, 'Đặt hàng thành công!')
             return redirect('order_success', order_id=order.id)
     else:
+        failures = hold_stock(request.user, [(product, quantity)])
+        if failures:
+            messages.error(request, str(OutOfStockError(failures)))
+            return redirect('product_detail', slug=product.slug)
+        
         initial = {
             'full_name': request.user.get_full_name() or request.user.username,
             'phone': request.user.phone or '',
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class OutboxConfig(AppConfig):
+    name = 'outbox'
+    verbose_name = 'Hàng đợi tác vụ'
+
+    def ready(self):
+        # Nạp các module <app>/tasks.py để đăng ký handler
+        autodiscover_modules('tasks')
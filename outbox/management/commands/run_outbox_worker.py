@@ -0,0 +1,28 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from outbox.queue import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Process outbox tasks (emails, notifications, ...) with a worker pool'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Process due tasks once and exit')
+    
+    def handle(self, *args, **options):
+        self.stdout.write(f"Outbox worker started ({options['workers']} workers)")
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='outbox') as executor:
+            while True:
+                processed = process_pending(limit=options['batch_size'], executor=executor)
+                if processed:
+                    self.stdout.write(f'Processed {processed} tasks')
+                if options['once'] and processed < options['batch_size']:
+                    break
+                if not processed:
+                    time.sleep(options['poll_interval'])
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """Tác vụ phụ (email, thông báo, ...) được ghi cùng transaction với dữ liệu chính"""
+    STATUS_CHOICES = [
+        ('pending', 'Chờ xử lý'),
+        ('processing', 'Đang xử lý'),
+        ('done', 'Hoàn thành'),
+        ('failed', 'Thất bại'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    available_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+    
+    class Meta:
+        verbose_name = 'Tác vụ'
+        verbose_name_plural = 'Tác vụ'
+        ordering = ['available_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+        ]
@@ -0,0 +1,216 @@
+"""
+Hàng đợi tác vụ phụ theo mô hình outbox.
+
+    from outbox.queue import enqueue, task
+
+    @task('orders.send_confirmation_email')
+    def send_confirmation_email(order_id): ...
+
+    enqueue('orders.send_confirmation_email', order_id=order.id)
+
+- 'database' (mặc định): enqueue() ghi một dòng OutboxMessage trong transaction hiện
+  tại, nên tác vụ chỉ tồn tại nếu dữ liệu chính được commit. Lệnh run_outbox_worker
+  lấy tác vụ theo lô (SELECT ... FOR UPDATE SKIP LOCKED), chạy bằng pool luồng,
+  thử lại với backoff lũy thừa khi lỗi.
+- 'memory' (cho test): tác vụ được đưa vào hàng đợi trong bộ nhớ sau khi commit,
+  chạy bằng process_pending().
+"""
+import logging
+import random
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Lấy lại tác vụ 'processing' quá thời gian này (worker bị dừng giữa chừng)
+VISIBILITY_TIMEOUT = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+
+_registry = {}
+
+
+def task(name):
+    """Đăng ký handler cho một loại tác vụ"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_handler(name):
+    return _registry[name]
+
+
+def backoff_delay(attempts):
+    """10s, 20s, 40s, ... tối đa 1 giờ, cộng ngẫu nhiên tới 10%"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * (1 + random.random() / 10))
+
+
+class DatabaseBackend:
+    def enqueue(self, name, payload, delay=None):
+        from .models import OutboxMessage
+
+        return OutboxMessage.objects.create(
+            task=name,
+            payload=payload,
+            available_at=timezone.now() + (delay or timedelta()),
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        )
+
+    def claim(self, limit):
+        """
+        Nhận tối đa `limit` tác vụ đến hạn, đánh dấu 'processing' và tính một lần thử.
+        Tác vụ bị nhận lại sau VISIBILITY_TIMEOUT (worker chết/treo) mà đã hết số lần thử
+        thì chuyển sang 'failed' thay vì chạy tiếp.
+        """
+        from .models import OutboxMessage
+
+        now = timezone.now()
+        due = Q(status='pending', available_at__lte=now) | Q(
+            status='processing', locked_at__lt=now - VISIBILITY_TIMEOUT
+        )
+        with transaction.atomic():
+            queryset = OutboxMessage.objects.filter(due).order_by('available_at')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            messages = []
+            exhausted = []
+            for message in queryset[:limit]:
+                if message.status == 'processing' and message.attempts >= message.max_attempts:
+                    exhausted.append(message.pk)
+                else:
+                    messages.append(message)
+            if exhausted:
+                OutboxMessage.objects.filter(pk__in=exhausted).update(
+                    status='failed', locked_at=None,
+                    last_error='Worker did not finish within the visibility timeout',
+                )
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                status='processing', locked_at=now, attempts=F('attempts') + 1
+            )
+        for message in messages:
+            message.status = 'processing'
+            message.locked_at = now
+            message.attempts += 1
+        return messages
+
+    def _owned(self, message):
+        """Chỉ ghi kết quả nếu tác vụ chưa bị worker khác nhận lại"""
+        from .models import OutboxMessage
+
+        return OutboxMessage.objects.filter(
+            pk=message.pk, status='processing', locked_at=message.locked_at
+        )
+
+    def complete(self, message):
+        message.status = 'done'
+        message.processed_at = timezone.now()
+        message.last_error = ''
+        return bool(self._owned(message).update(
+            status='done', processed_at=message.processed_at, last_error='', locked_at=None,
+        ))
+
+    def fail(self, message, error):
+        # attempts đã được tăng khi nhận tác vụ
+        message.last_error = error
+        if message.attempts >= message.max_attempts:
+            message.status = 'failed'
+        else:
+            message.status = 'pending'
+            message.available_at = timezone.now() + backoff_delay(message.attempts)
+        return bool(self._owned(message).update(
+            last_error=error, status=message.status, available_at=message.available_at, locked_at=None,
+        ))
+
+
+class MemoryMessage:
+    def __init__(self, name, payload):
+        self.task = name
+        self.payload = payload
+        self.attempts = 0
+        self.status = 'pending'
+        self.last_error = ''
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.queue = deque()
+        self.processed = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, name, payload, delay=None):
+        message = MemoryMessage(name, payload)
+        transaction.on_commit(lambda: self.queue.append(message))
+        return message
+
+    def claim(self, limit):
+        with self._lock:
+            messages = []
+            while self.queue and len(messages) < limit:
+                message = self.queue.popleft()
+                message.attempts += 1
+                messages.append(message)
+            return messages
+
+    def complete(self, message):
+        message.status = 'done'
+        self.processed.append(message)
+
+    def fail(self, message, error):
+        message.last_error = error
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+            self.processed.append(message)
+        else:
+            self.queue.append(message)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = MemoryBackend() if settings.OUTBOX_BACKEND == 'memory' else DatabaseBackend()
+    return _backend
+
+
+def enqueue(name, delay=None, **payload):
+    """Ghi tác vụ vào outbox (trong transaction hiện tại)"""
+    if name not in _registry:
+        raise KeyError(f'Unknown outbox task: {name}')
+    return get_backend().enqueue(name, payload, delay=delay)
+
+
+def run_message(message):
+    backend = get_backend()
+    try:
+        get_handler(message.task)(**message.payload)
+    except Exception as e:
+        logger.exception('Outbox task %s failed', message.task)
+        backend.fail(message, f'{type(e).__name__}: {e}')
+        return False
+    else:
+        backend.complete(message)
+        return True
+    finally:
+        close_old_connections()
+
+
+def process_pending(limit=100, executor=None):
+    """Chạy một lô tác vụ đến hạn, trả về số tác vụ đã xử lý"""
+    messages = get_backend().claim(limit)
+    if executor is None:
+        for message in messages:
+            run_message(message)
+    else:
+        list(executor.map(run_message, messages))
+    return len(messages)
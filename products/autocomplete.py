@@ -0,0 +1,219 @@
+"""
+Gợi ý tìm kiếm (autocomplete) trong bộ nhớ cho /api/search/.
+
+Chỉ mục gồm tên các sản phẩm đang bán, đã bỏ dấu:
+- tiền tố của từng từ -> tập id sản phẩm
+- trigram -> tập từ, dùng để tìm từ gần đúng khi gõ sai (khoảng cách sửa <= 1-2)
+Kết quả trả về là payload JSON đã tính sẵn. Chỉ mục được cập nhật qua signal
+(products/signals.py, sau khi transaction commit) và nạp lại định kỳ để đồng bộ giữa
+các worker. Chỉ một luồng nạp lại tại một thời điểm; lần nạp định kỳ chạy ở luồng nền
+và các request vẫn dùng chỉ mục cũ cho tới khi chỉ mục mới sẵn sàng.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import close_old_connections
+
+from .search import fold_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Thời gian tối đa giữa hai lần nạp lại toàn bộ chỉ mục (giây)
+REFRESH_SECONDS = 300
+MAX_PREFIX_LENGTH = 32
+# Các trường ảnh hưởng đến kết quả gợi ý
+INDEXED_FIELDS = {'name', 'slug', 'price', 'sale_price', 'image', 'is_active', 'sold_count'}
+
+
+def _trigrams(word):
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Khoảng cách Damerau-Levenshtein (OSA), dừng sớm khi vượt limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def build_payload(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': str(product.final_price),
+        'image': product.image.url if product.image else '',
+        'url': product.get_absolute_url(),
+    }
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Giữ trong suốt một lần nạp lại: chỉ một luồng được nạp
+        self._rebuild_lock = threading.Lock()
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._payloads = {}
+        self._names = {}
+        self._sold = {}
+        self._tokens = {}
+        self._prefixes = defaultdict(set)
+        self._vocabulary = defaultdict(set)
+        self._trigrams = defaultdict(set)
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def rebuild(self):
+        """Nạp lại toàn bộ sản phẩm đang bán từ CSDL"""
+        from .models import Product
+
+        products = Product.objects.filter(is_active=True).only(
+            'id', 'name', 'slug', 'price', 'sale_price', 'image', 'sold_count'
+        )
+        fresh = AutocompleteIndex()
+        for product in products.iterator(chunk_size=1000):
+            fresh._add(product)
+        with self._lock:
+            self._payloads = fresh._payloads
+            self._names = fresh._names
+            self._sold = fresh._sold
+            self._tokens = fresh._tokens
+            self._prefixes = fresh._prefixes
+            self._vocabulary = fresh._vocabulary
+            self._trigrams = fresh._trigrams
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        """Lần đầu: một luồng nạp, các luồng khác chờ. Sau đó: nạp lại ở nền khi quá hạn"""
+        if not self.is_built:
+            with self._rebuild_lock:
+                if not self.is_built:
+                    self.rebuild()
+        elif time.monotonic() - self._built_at > REFRESH_SECONDS:
+            if self._rebuild_lock.acquire(blocking=False):
+                threading.Thread(target=self._background_rebuild, daemon=True).start()
+
+    def _background_rebuild(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Autocomplete index rebuild failed')
+        finally:
+            self._rebuild_lock.release()
+            close_old_connections()
+
+    def update(self, product):
+        """Thêm/cập nhật một sản phẩm (gọi từ signal)"""
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(product.pk)
+            if product.is_active:
+                self._add(product)
+
+    def remove(self, product_id):
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(product_id)
+
+    def search(self, query, limit=10):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure_built()
+
+        with self._lock:
+            candidates = None
+            for token in tokens:
+                ids = self._prefixes.get(token[:MAX_PREFIX_LENGTH]) or self._fuzzy(token)
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+
+            phrase = ' '.join(tokens)
+            ranked = sorted(
+                candidates,
+                key=lambda pk: (
+                    not self._names[pk].startswith(phrase),
+                    -self._sold[pk],
+                    self._names[pk],
+                ),
+            )
+            return [self._payloads[pk] for pk in ranked[:limit]]
+
+    def _add(self, product):
+        folded = fold_text(product.name)
+        tokens = set(tokenize(product.name))
+        self._payloads[product.pk] = build_payload(product)
+        self._names[product.pk] = folded
+        self._sold[product.pk] = product.sold_count
+        self._tokens[product.pk] = tokens
+        for token in tokens:
+            self._vocabulary[token].add(product.pk)
+            for trigram in _trigrams(token):
+                self._trigrams[trigram].add(token)
+            for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                self._prefixes[token[:length]].add(product.pk)
+
+    def _remove(self, product_id):
+        tokens = self._tokens.pop(product_id, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            self._vocabulary[token].discard(product_id)
+            for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                prefix = token[:length]
+                self._prefixes[prefix].discard(product_id)
+                if not self._prefixes[prefix]:
+                    del self._prefixes[prefix]
+        del self._payloads[product_id]
+        del self._names[product_id]
+        del self._sold[product_id]
+
+    def _fuzzy(self, token):
+        """Tìm các sản phẩm có từ gần giống token (gõ sai 1-2 ký tự)"""
+        if len(token) < 3:
+            return set()
+        limit = 1 if len(token) <= 5 else 2
+        shared = Counter()
+        for trigram in _trigrams(token):
+            shared.update(self._trigrams.get(trigram, ()))
+        ids = set()
+        for word, _ in shared.most_common(50):
+            if not self._vocabulary.get(word):
+                continue
+            distance = min(
+                _edit_distance(token, word, limit),
+                _edit_distance(token, word[:len(token)], limit),
+            )
+            if distance <= limit:
+                ids |= self._vocabulary[word]
+        return ids
+
+
+index = AutocompleteIndex()
+
+
+def suggest(query, limit=10):
+    """Gợi ý sản phẩm cho chuỗi đang gõ"""
+    return index.search(query, limit=limit)
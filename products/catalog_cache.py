@@ -0,0 +1,5 @@
+"""Cache dữ liệu danh mục sản phẩm (alias 'catalog' trong CACHES, tách khỏi session/default)"""
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+cache = ConnectionProxy(caches, 'catalog')
@@ -0,0 +1,88 @@
+"""
+Đếm facet cho trang danh sách sản phẩm.
+
+Mức đánh giá, còn hàng và đang giảm giá được đếm trong MỘT truy vấn aggregate với
+COUNT(...) FILTER (WHERE ...). Khoảng giá được đếm cùng truy vấn đó, hoặc trên tập
+chưa lọc theo giá khi đang lọc giá (để các khoảng khác không về 0). Tương tự, danh
+mục được đếm bằng một truy vấn GROUP BY trên tập kết quả chưa lọc theo danh mục.
+facets['categories'] chỉ gồm các danh mục có sản phẩm trong kết quả.
+"""
+from django.db.models import Count, F, Q
+
+# (giá từ, giá đến) - None là không giới hạn
+PRICE_BUCKETS = [
+    (None, 100000),
+    (100000, 200000),
+    (200000, 500000),
+    (500000, 1000000),
+    (1000000, None),
+]
+
+# Từ N sao trở lên
+RATING_BANDS = [4, 3, 2, 1]
+
+
+def price_bucket_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+def rating_band_q(stars):
+    # average_rating >= stars  <=>  rating_sum >= stars * rating_count
+    return Q(rating_count__gt=0, rating_sum__gte=stars * F('rating_count'))
+
+
+def compute_facets(queryset, category_queryset=None, price_queryset=None):
+    """
+    queryset: tập kết quả đã áp dụng mọi bộ lọc.
+    category_queryset: tập kết quả chưa lọc theo danh mục (mặc định = queryset).
+    price_queryset: tập kết quả chưa lọc theo giá (mặc định = queryset).
+    """
+    price_aggregates = {
+        f'price_{i}': Count('id', filter=price_bucket_q(low, high))
+        for i, (low, high) in enumerate(PRICE_BUCKETS)
+    }
+    aggregates = {'total': Count('id')}
+    if price_queryset is None:
+        aggregates.update(price_aggregates)
+    for stars in RATING_BANDS:
+        aggregates[f'rating_{stars}'] = Count('id', filter=rating_band_q(stars))
+    aggregates['in_stock'] = Count('id', filter=Q(stock__gt=0))
+    aggregates['on_sale'] = Count('id', filter=Q(sale_price__isnull=False))
+
+    row = queryset.order_by().aggregate(**aggregates)
+    if price_queryset is not None:
+        row.update(price_queryset.order_by().aggregate(**price_aggregates))
+
+    if category_queryset is None:
+        category_queryset = queryset
+    categories = category_queryset.order_by().filter(category__is_active=True).values(
+        'category_id', 'category__name', 'category__slug'
+    ).annotate(count=Count('id')).order_by('category__name')
+
+    return {
+        'total': row['total'],
+        'categories': [
+            {
+                'id': c['category_id'],
+                'name': c['category__name'],
+                'slug': c['category__slug'],
+                'count': c['count'],
+            }
+            for c in categories
+        ],
+        'price_buckets': [
+            {'min': low, 'max': high, 'count': row[f'price_{i}']}
+            for i, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'rating_bands': [
+            {'stars': stars, 'count': row[f'rating_{stars}']}
+            for stars in RATING_BANDS
+        ],
+        'in_stock': row['in_stock'],
+        'on_sale': row['on_sale'],
+    }
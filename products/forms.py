@@ -64,6 +64,21 @@ class ProductSearchForm(forms.Form):
             'placeholder': 'Giá đến'
         })
     )
+    min_rating = forms.TypedChoiceField(
+        required=False,
+        coerce=int,
+        empty_value=None,
+        choices=[('', 'Mọi đánh giá'), (4, 'Từ 4 sao'), (3, 'Từ 3 sao'), (2, 'Từ 2 sao'), (1, 'Từ 1 sao')],
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    in_stock = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    on_sale = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
     sort = forms.ChoiceField(
         required=False,
         choices=[
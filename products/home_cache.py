@@ -0,0 +1,141 @@
+"""
+Cache HTML các khối trên trang chủ (nổi bật, mới, bán chạy, danh mục).
+
+Mỗi khối được lưu riêng kèm danh sách id sản phẩm/danh mục đang hiển thị, nhờ đó
+signal của Product/Category chỉ xóa đúng những khối bị ảnh hưởng. Khi cache trúng,
+trang chủ không truy vấn CSDL cho phần danh mục sản phẩm.
+
+Tồn kho, lượt bán và đánh giá được đổi bằng .update() (đặt/hủy đơn, đánh giá) nên
+không có signal; các nơi đó gọi invalidate_products() sau khi commit.
+
+Form "Thêm vào giỏ" trong thẻ sản phẩm chứa CSRF token riêng của từng người dùng,
+nên HTML được cache với một chuỗi giữ chỗ và thay bằng token thật khi trả về.
+"""
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .catalog_cache import cache
+
+CACHE_PREFIX = 'home:section:'
+CACHE_TIMEOUT = 60 * 15
+CSRF_PLACEHOLDER = '__HOME_CSRF_TOKEN__'
+
+PRODUCT_SECTIONS = ('featured_products', 'new_products', 'best_sellers')
+SECTIONS = PRODUCT_SECTIONS + ('categories',)
+
+
+def _section_queryset(name):
+    from .models import Category, Product
+
+    products = Product.objects.filter(is_active=True).select_related('category')
+    if name == 'featured_products':
+        return products.filter(is_featured=True)[:8]
+    if name == 'new_products':
+        return products.order_by('-created_at')[:8]
+    if name == 'best_sellers':
+        return products.order_by('-sold_count')[:4]
+    return Category.objects.filter(is_active=True)[:6]
+
+
+def _render_section(name):
+    items = list(_section_queryset(name))
+    if name == 'categories':
+        html = render_to_string('products/partials/home_categories.html', {'categories': items})
+        return {'html': html, 'category_ids': [c.id for c in items]}
+
+    html = render_to_string('products/partials/home_products.html', {
+        'products': items,
+        'empty_message': 'Chưa có sản phẩm nổi bật.' if name == 'featured_products' else '',
+        'csrf_token': CSRF_PLACEHOLDER,
+    })
+    return {
+        'html': html,
+        'product_ids': [p.id for p in items],
+        'category_ids': list({p.category_id for p in items}),
+        'min_sold': min((p.sold_count for p in items), default=0),
+        'min_created': min((p.created_at for p in items), default=None),
+        'is_full': len(items) >= (4 if name == 'best_sellers' else 8),
+    }
+
+
+def get_sections(request):
+    """Trả về dict {tên khối: HTML} cho template trang chủ"""
+    keys = {name: CACHE_PREFIX + name for name in SECTIONS}
+    cached = cache.get_many(keys.values())
+
+    missing = {}
+    sections = {}
+    for name, key in keys.items():
+        entry = cached.get(key)
+        if entry is None:
+            entry = missing[key] = _render_section(name)
+        sections[name] = entry['html']
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+
+    token = get_token(request)
+    return {
+        f'{name}_html': mark_safe(html.replace(CSRF_PLACEHOLDER, token))
+        for name, html in sections.items()
+    }
+
+
+def invalidate(*names):
+    cache.delete_many([CACHE_PREFIX + name for name in names])
+
+
+def invalidate_for_product(product, created=False):
+    """Xóa các khối đang hiển thị hoặc có thể phải hiển thị sản phẩm này"""
+    keys = {CACHE_PREFIX + name: name for name in PRODUCT_SECTIONS}
+    cached = cache.get_many(keys.keys())
+    stale = []
+    for key, name in keys.items():
+        entry = cached.get(key)
+        if entry is None:
+            continue
+        if product.pk in entry['product_ids']:
+            stale.append(name)
+        elif not product.is_active:
+            continue
+        elif name == 'featured_products' and product.is_featured:
+            stale.append(name)
+        elif name == 'new_products' and (
+            # Sản phẩm mới, hoặc được bật lại và đủ mới để lọt vào khối
+            created or not entry['is_full'] or entry.get('min_created') is None
+            or product.created_at > entry['min_created']
+        ):
+            stale.append(name)
+        elif name == 'best_sellers' and (
+            not entry['is_full'] or product.sold_count > entry['min_sold']
+        ):
+            stale.append(name)
+    if stale:
+        invalidate(*stale)
+
+
+def invalidate_products(product_ids, sold_changed=False):
+    """Xóa các khối đang hiển thị các sản phẩm này (và bán chạy nếu lượt bán đổi)"""
+    product_ids = set(product_ids)
+    keys = {CACHE_PREFIX + name: name for name in PRODUCT_SECTIONS}
+    cached = cache.get_many(keys.keys())
+    stale = [
+        name for key, name in keys.items()
+        if key in cached and product_ids & set(cached[key]['product_ids'])
+    ]
+    if sold_changed and 'best_sellers' not in stale:
+        stale.append('best_sellers')
+    if stale:
+        invalidate(*stale)
+
+
+def invalidate_for_category(category):
+    """Đổi danh mục -> xóa khối danh mục và các khối có thẻ sản phẩm thuộc danh mục đó"""
+    keys = [CACHE_PREFIX + name for name in PRODUCT_SECTIONS]
+    cached = cache.get_many(keys)
+    stale = ['categories']
+    for name in PRODUCT_SECTIONS:
+        entry = cached.get(CACHE_PREFIX + name)
+        if entry is not None and category.pk in entry['category_ids']:
+            stale.append(name)
+    invalidate(*stale)
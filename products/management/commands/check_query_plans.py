@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from orders.models import Order
+from products.models import Product
+
+
+def listing_queries():
+    """(mô tả, queryset, tên chỉ mục phải được dùng)"""
+    active = Product.objects.filter(is_active=True)
+    return [
+        ('products: newest', active.order_by('-created_at', '-id')[:12], 'prod_active_created_idx'),
+        ('products: price asc', active.order_by('price', 'id')[:12], 'prod_active_price_idx'),
+        ('products: best seller', active.order_by('-sold_count', '-id')[:12], 'prod_active_sold_idx'),
+        ('products: name', active.order_by('name', 'id')[:12], 'prod_active_name_idx'),
+        ('products: by category', active.filter(category_id=1).order_by('-created_at', '-id')[:12], 'prod_cat_active_created_idx'),
+        ('products: featured', active.filter(is_featured=True).order_by('-created_at')[:8], 'prod_featured_idx'),
+        ('orders: user history', Order.objects.filter(user_id=1).order_by('-created_at'), 'order_user_created_idx'),
+        ('orders: by status', Order.objects.filter(status='pending').order_by('created_at'), 'order_status_created_idx'),
+        ('notifications: unread', Notification.objects.filter(user_id=1, is_read=False).order_by('-created_at'), 'notif_user_unread_idx'),
+        ('notifications: recent', Notification.objects.filter(user_id=1).order_by('-created_at')[:5], 'notif_user_created_idx'),
+        ('notifications: page', Notification.objects.filter(user_id=1).order_by('-created_at', '-id')[:21], 'notif_user_created_idx'),
+        ('notifications: expired', Notification.objects.filter(notification_type='promo', created_at__lt=timezone.now()).order_by('created_at').values('pk')[:1000], 'notif_type_created_idx'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the main listing queries and check that they use their indexes'
+    
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Bảng nhỏ (dev/CI) khiến planner chọn Seq Scan, tắt để kiểm tra chỉ mục
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            
+            for label, queryset, index_name in listing_queries():
+                plan = queryset.explain()
+                if index_name in plan:
+                    self.stdout.write(f'OK    {label}: {index_name}')
+                else:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FAIL  {label}: expected {index_name}'))
+                    self.stdout.write(plan)
+        
+        if failures:
+            raise CommandError(f'{len(failures)} queries do not use their index')
+        self.stdout.write(self.style.SUCCESS('All listing queries use their indexes'))
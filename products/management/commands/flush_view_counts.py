@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered product view counts to the database (redis backend)'
+    
+    def handle(self, *args, **options):
+        if settings.VIEW_COUNTER_BACKEND != 'redis':
+            # Bộ đệm 'local' nằm trong bộ nhớ của từng tiến trình web, lệnh này không thấy được
+            raise CommandError(
+                f"VIEW_COUNTER_BACKEND is '{settings.VIEW_COUNTER_BACKEND}': views are buffered in "
+                "each web process and flushed by its own background thread; set it to 'redis' "
+                "to flush from here"
+            )
+        total = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} product views'))
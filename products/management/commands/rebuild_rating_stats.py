@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from products.models import Product, Review
+from products.ratings import build_histogram, stats_from_histogram
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized rating statistics on products'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        # Một truy vấn GROUP BY cho toàn bộ đánh giá đã duyệt
+        rows_by_product = {}
+        rows = Review.objects.filter(is_approved=True).values('product_id', 'rating').annotate(
+            count=Count('id')
+        )
+        for row in rows:
+            rows_by_product.setdefault(row['product_id'], []).append(row)
+        
+        fields = ['rating_sum', 'rating_count', 'rating_histogram']
+        batch = []
+        updated = 0
+        for product in Product.objects.only('id', *fields).iterator(chunk_size=batch_size):
+            stats = stats_from_histogram(build_histogram(rows_by_product.get(product.id, [])))
+            for field, value in stats.items():
+                setattr(product, field, value)
+            batch.append(product)
+            if len(batch) >= batch_size:
+                Product.objects.bulk_update(batch, fields)
+                updated += len(batch)
+                batch = []
+        if batch:
+            Product.objects.bulk_update(batch, fields)
+            updated += len(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating statistics for {updated} products'))
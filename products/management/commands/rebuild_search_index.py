@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from products import search
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+    
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        self.stdout.write(f'Rebuilding search index ({type(backend).__name__})...')
+        
+        # Tính lại nội dung tìm kiếm đã bỏ dấu cho từng sản phẩm
+        products = Product.objects.select_related('category')
+        updated = 0
+        for product in products.iterator(chunk_size=1000):
+            document = search.build_search_document(product)
+            if document != product.search_document:
+                Product.objects.filter(pk=product.pk).update(search_document=document)
+                updated += 1
+        
+        backend.rebuild(products)
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({updated} documents updated)'))
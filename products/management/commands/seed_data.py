@@ -127,7 +127,8 @@ class Command(BaseCommand):
                 'description': 'Chuyển khoản qua ngân hàng',
                 'bank_name': 'Vietcombank',
                 'bank_account': '1234567890',
-                'bank_holder': 'PHONE ACCESSORIES SHOP'
+                'bank_holder': 'PHONE ACCESSORIES SHOP',
+                'bank_bin': '970436',
             },
             {
                 'name': 'Ví điện tử MoMo',
@@ -2,6 +2,9 @@ from django.db import models
 from django.urls import reverse
 from accounts.models import User
 
+from . import search
+from .search import build_search_document
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name='Tên danh mục')
@@ -41,15 +44,29 @@ class Product(models.Model):
     views_count = models.PositiveIntegerField(default=0)
     sold_count = models.PositiveIntegerField(default=0)
     
+    # Thống kê đánh giá (chỉ tính đánh giá đã duyệt, xem products/ratings.py)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_histogram = models.JSONField(default=list, blank=True)  # [số 1*, 2*, 3*, 4*, 5*]
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Nội dung tìm kiếm đã bỏ dấu (xem products/search.py)
+    search_document = models.TextField(blank=True, editable=False)
+    
     def __str__(self):
         return self.name
     
     def get_absolute_url(self):
         return reverse('product_detail', args=[self.slug])
     
+    def save(self, *args, **kwargs):
+        # Cập nhật nội dung tìm kiếm khi lưu toàn bộ sản phẩm
+        if kwargs.get('update_fields') is None:
+            self.search_document = build_search_document(self)
+        super().save(*args, **kwargs)
+    
     @property
     def final_price(self):
         """Trả về giá cuối cùng (giá khuyến mãi nếu có)"""
@@ -65,9 +82,8 @@ class Product(models.Model):
     @property
     def average_rating(self):
         """Tính điểm đánh giá trung bình"""
-        reviews = self.reviews.all()
-        if reviews.exists():
-            return round(sum(r.rating for r in reviews) / reviews.count(), 1)
+        if self.rating_count:
+            return round(self.rating_sum / self.rating_count, 1)
         return 0
     
     @property
@@ -86,6 +102,16 @@ class Product(models.Model):
         verbose_name = 'Sản phẩm'
         verbose_name_plural = 'Sản phẩm'
         ordering = ['-created_at']
+        # Chỉ mục một phần trên sản phẩm đang bán, theo các kiểu sắp xếp của danh sách
+        # (kiểm tra bằng: python manage.py check_query_plans)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True), name='prod_active_created_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(is_active=True), name='prod_active_price_idx'),
+            models.Index(fields=['-sold_count', '-id'], condition=models.Q(is_active=True), name='prod_active_sold_idx'),
+            models.Index(fields=['name', 'id'], condition=models.Q(is_active=True), name='prod_active_name_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(is_active=True), name='prod_cat_active_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True, is_featured=True), name='prod_featured_idx'),
+        ] + search.model_indexes()
 
 
 class ProductImage(models.Model):
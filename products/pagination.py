@@ -0,0 +1,175 @@
+"""
+Phân trang theo con trỏ (keyset) cho danh sách sản phẩm.
+
+Thay vì OFFSET, mỗi trang lọc theo giá trị khóa sắp xếp của phần tử cuối trang trước
+(kèm id để phân định), nên thời gian truy vấn không phụ thuộc vào độ sâu trang.
+Con trỏ là chuỗi đã ký (django.core.signing), client không đọc/sửa được.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+
+from .catalog_cache import cache
+
+CURSOR_SALT = 'products.cursor'
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Tùy chọn sắp xếp của ProductSearchForm -> khóa keyset (luôn kết thúc bằng id)
+SORT_ORDERINGS = {
+    '': ('-created_at', '-id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'name': ('name', 'id'),
+    'best_seller': ('-sold_count', '-id'),
+}
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def encode_cursor(values, direction):
+    return signing.dumps({'v': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        return data['v'], data['d']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None, None
+
+
+def _keyset_filter(ordering, values, backwards):
+    """(a, id) > (va, vid) viết dưới dạng OR/AND để dùng được chỉ mục với mọi CSDL"""
+    condition = Q()
+    for i, (field, descending) in enumerate(ordering):
+        lookup = 'lt' if descending != backwards else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[i]})
+        for j in range(i):
+            step &= Q(**{ordering[j][0]: values[j]})
+        condition |= step
+    return condition
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list, queryset, next_values, previous_values):
+        self.object_list = object_list
+        self._queryset = queryset
+        self.next_cursor = encode_cursor(next_values, 'n') if next_values else None
+        self.previous_cursor = encode_cursor(previous_values, 'p') if previous_values else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def approximate_count(self):
+        return approximate_count(self._queryset)
+
+
+class CursorPaginator:
+    def __init__(self, queryset, ordering, per_page):
+        self.ordering = _parse_ordering(ordering)
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+
+    def _values(self, obj):
+        values = []
+        for field, _ in self.ordering:
+            value = getattr(obj, field)
+            values.append(value if isinstance(value, (int, str)) or value is None else str(value))
+        return values
+
+    def _to_python(self, values):
+        model = self.queryset.model
+        return [
+            model._meta.get_field(field).to_python(value)
+            for (field, _), value in zip(self.ordering, values)
+        ]
+
+    def get_page(self, token):
+        values, direction = decode_cursor(token) if token else (None, None)
+        if values is None or len(values) != len(self.ordering):
+            values, direction = None, 'n'
+
+        queryset = self.queryset
+        backwards = direction == 'p'
+        if values is not None:
+            queryset = queryset.filter(_keyset_filter(self.ordering, self._to_python(values), backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+        if not items:
+            return CursorPage([], self.queryset, None, None)
+
+        has_next = has_more if not backwards else True
+        has_previous = (values is not None) if not backwards else has_more
+        return CursorPage(
+            items,
+            self.queryset,
+            self._values(items[-1]) if has_next else None,
+            self._values(items[0]) if has_previous else None,
+        )
+
+
+def approximate_count(queryset):
+    """Số dòng ước lượng: thống kê planner trên PostgreSQL, COUNT(*) có cache ở nơi khác"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            import json
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    key = 'products:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def paginate_products(request, queryset, sort='', per_page=12, count=None):
+    """
+    Phân trang danh sách sản phẩm.
+
+    Dùng keyset khi PRODUCT_PAGINATION = 'cursor' hoặc request có tham số ?cursor=,
+    ngược lại dùng Paginator (OFFSET) như cũ. Kết quả tìm kiếm xếp theo độ liên quan
+    luôn dùng Paginator vì thứ hạng không phải là cột trong bảng.
+    Truyền `count` (nếu đã biết, vd. từ facet) để Paginator không phải COUNT(*) lại.
+    """
+    use_cursor = settings.PRODUCT_PAGINATION == 'cursor' or 'cursor' in request.GET
+    ranked = not sort and 'search_rank' in queryset.query.annotations
+    if use_cursor and sort in SORT_ORDERINGS and not ranked:
+        paginator = CursorPaginator(queryset, SORT_ORDERINGS[sort], per_page)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(queryset, per_page)
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,40 @@
+"""
+Thống kê đánh giá lưu sẵn trên Product (rating_sum, rating_count, rating_histogram).
+
+Được tính lại trong cùng transaction mỗi khi một Review được tạo, sửa hoặc xóa.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from . import home_cache
+
+
+def build_histogram(rows):
+    """rows: các dict {'rating': ..., 'count': ...} -> [số 1*, ..., số 5*]"""
+    histogram = [0] * 5
+    for row in rows:
+        histogram[row['rating'] - 1] = row['count']
+    return histogram
+
+
+def stats_from_histogram(histogram):
+    return {
+        'rating_sum': sum((star + 1) * count for star, count in enumerate(histogram)),
+        'rating_count': sum(histogram),
+        'rating_histogram': histogram,
+    }
+
+
+def refresh_product_rating(product_id):
+    """Tính lại thống kê đánh giá của một sản phẩm (khóa dòng Product)"""
+    from .models import Product, Review
+
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().filter(pk=product_id)
+        if not locked.exists():
+            return
+        rows = Review.objects.filter(
+            product_id=product_id, is_approved=True
+        ).values('rating').annotate(count=Count('id'))
+        locked.update(**stats_from_histogram(build_histogram(rows)))
+        transaction.on_commit(lambda: home_cache.invalidate_products([product_id]))
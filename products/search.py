@@ -0,0 +1,215 @@
+"""
+Tìm kiếm toàn văn cho sản phẩm.
+
+Mỗi sản phẩm giữ một cột `search_document` (tên + danh mục + mô tả đã bỏ dấu).
+- PostgreSQL: tsvector trên `search_document` với chỉ mục GIN (khai báo trong
+  Product.Meta.indexes, tạo bằng migration).
+- SQLite: bảng ảo FTS5 `product_search_fts`, tạo bởi lệnh rebuild_search_index và cập
+  nhật theo từng sản phẩm; chưa có bảng thì dùng cách tìm dự phòng.
+- CSDL khác: lọc `icontains` trên `search_document` (đã bỏ dấu, không JOIN).
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'product_search_fts'
+GIN_INDEX = 'products_product_search_gin'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường ("Ốp lưng" -> "op lung")"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+def build_search_document(product):
+    """Nội dung được đánh chỉ mục của một sản phẩm"""
+    category_name = product.category.name if product.category_id else ''
+    return '\n'.join(
+        fold_text(part) for part in (product.name, category_name, product.description)
+    )
+
+
+def model_indexes():
+    """Chỉ mục GIN cho Product.Meta.indexes (chỉ khi dùng PostgreSQL)"""
+    if 'postgresql' not in settings.DATABASES['default']['ENGINE']:
+        return []
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return [GinIndex(SearchVector('search_document', config='simple'), name=GIN_INDEX)]
+
+
+class PostgresSearchBackend:
+    """tsvector('simple') trên search_document, xếp hạng bằng ts_rank"""
+
+    def rebuild(self, products):
+        # search_document được tính trong Product.save(), chỉ mục GIN do migration tạo
+        pass
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        search_query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            config='simple',
+            search_type='raw',
+        )
+        vector = SearchVector('search_document', config='simple')
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, search_query),
+        ).filter(search_vector=search_query).order_by('-search_rank', '-created_at')
+
+
+class SQLiteSearchBackend:
+    """Bảng ảo FTS5 (name, category, description), xếp hạng bằng bm25"""
+
+    # Trọng số bm25 cho các cột name, category, description
+    WEIGHTS = (10.0, 4.0, 1.0)
+
+    def __init__(self):
+        self._exists = False
+
+    def exists(self):
+        # Chỉ nhớ khi bảng đã có: rebuild_search_index có thể tạo bảng từ tiến trình khác,
+        # khi đó worker đang chạy phải dùng (và ghi vào) FTS ngay, không đợi khởi động lại
+        if not self._exists:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+                )
+                self._exists = cursor.fetchone() is not None
+        return self._exists
+
+    def rebuild(self, products):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            cursor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, category, description)")
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, category, description) VALUES (%s, %s, %s, %s)",
+                [self._row(product) for product in products.iterator(chunk_size=1000)],
+            )
+        self._exists = True
+
+    def index_product(self, product):
+        if not self.exists():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, category, description) VALUES (%s, %s, %s, %s)",
+                self._row(product),
+            )
+
+    def remove_product(self, product_id):
+        if not self.exists():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+    def search(self, queryset, query):
+        if not self.exists():
+            # Chưa chạy rebuild_search_index
+            return BasicSearchBackend().search(queryset, query)
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        match = ' AND '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        # Lọc và xếp hạng ngay trong SQL, nên phân trang đi được tới mọi kết quả
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        rank = RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('search_rank', '-created_at')
+
+    def _row(self, product):
+        category_name = product.category.name if product.category_id else ''
+        return (
+            product.pk,
+            fold_text(product.name),
+            fold_text(category_name),
+            fold_text(product.description),
+        )
+
+
+class BasicSearchBackend:
+    """Dự phòng: icontains trên search_document, ưu tiên khớp tên"""
+
+    def rebuild(self, products):
+        pass
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        for token in tokens:
+            queryset = queryset.filter(search_document__icontains=token)
+        return queryset.annotate(
+            search_rank=Case(
+                When(search_document__startswith=tokens[0], then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank', '-created_at')
+
+
+_backends = {}
+
+
+def get_backend():
+    vendor = connection.vendor
+    if vendor not in _backends:
+        if vendor == 'postgresql':
+            _backends[vendor] = PostgresSearchBackend()
+        elif vendor == 'sqlite' and _sqlite_has_fts5():
+            _backends[vendor] = SQLiteSearchBackend()
+        else:
+            _backends[vendor] = BasicSearchBackend()
+    return _backends[vendor]
+
+
+def _sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def search_products(queryset, query):
+    """Tìm kiếm và sắp xếp theo độ liên quan"""
+    return get_backend().search(queryset, query)
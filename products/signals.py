@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, home_cache, ratings, search
+from .models import Category, Product, Review
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """Cập nhật chỉ mục tìm kiếm khi sản phẩm thay đổi"""
+    if update_fields is None:
+        transaction.on_commit(lambda: search.get_backend().index_product(instance))
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or autocomplete.INDEXED_FIELDS & set(update_fields):
+        transaction.on_commit(lambda: autocomplete.index.update(instance))
+
+
+@receiver(post_save, sender=Product)
+def invalidate_home_sections(sender, instance, created, **kwargs):
+    # Sau commit, để trang chủ render đồng thời không cache lại dữ liệu cũ
+    transaction.on_commit(lambda: home_cache.invalidate_for_product(instance, created=created))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    
+    def unindex():
+        search.get_backend().remove_product(product_id)
+        autocomplete.index.remove(product_id)
+        home_cache.invalidate_products([product_id])
+    
+    transaction.on_commit(unindex)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_home_categories(sender, instance, **kwargs):
+    transaction.on_commit(lambda: home_cache.invalidate_for_category(instance))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    """Đổi tên danh mục -> đánh chỉ mục lại các sản phẩm thuộc danh mục"""
+    if created:
+        return
+    changed = []
+    for product in instance.products.select_related('category').iterator(chunk_size=500):
+        document = search.build_search_document(product)
+        if document != product.search_document:
+            Product.objects.filter(pk=product.pk).update(search_document=document)
+            product.search_document = document
+            changed.append(product)
+    
+    def reindex():
+        backend = search.get_backend()
+        for product in changed:
+            backend.index_product(product)
+    
+    if changed:
+        transaction.on_commit(reindex)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_product_rating(sender, instance, **kwargs):
+    """Giữ thống kê đánh giá trên Product luôn khớp với bảng Review"""
+    ratings.refresh_product_rating(instance.product_id)
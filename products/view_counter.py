@@ -0,0 +1,174 @@
+"""
+Bộ đếm lượt xem sản phẩm có bộ đệm.
+
+Lượt xem được cộng dồn trong bộ nhớ tiến trình ('local') hoặc trong Redis ('redis')
+rồi ghi xuống CSDL theo lô bằng UPDATE ... SET views_count = views_count + n.
+
+- local (chỉ dùng khi phát triển): xả định kỳ bởi luồng nền và khi tiến trình tắt
+  (atexit). Lượt xem chưa xả sẽ mất nếu tiến trình bị giết (SIGKILL), khi deploy hoặc
+  chết đột ngột; lệnh flush_view_counts không xả được bộ đệm của tiến trình khác.
+- redis (mặc định): HINCRBY vào một hash, giữ được qua khởi động lại; khi xả, hash được RENAME sang khóa "đang xử lý" riêng
+  của worker (kèm thời điểm nhận) và chỉ bị xóa sau khi UPDATE đã commit. Khóa của
+  worker khác chỉ được nhận lại khi đã quá PROCESSING_LEASE_SECONDS (worker đó coi như
+  đã chết), bằng RENAME sang khóa mới nên chỉ một worker nhận được. Worker chết sau khi
+  commit nhưng trước khi xóa khóa thì lô đó bị cộng hai lần khi được nhận lại.
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'product_views:pending'
+PROCESSING_PREFIX = 'product_views:processing:'
+# Khóa "đang xử lý" cũ hơn thời gian này được coi là của worker đã chết
+PROCESSING_LEASE_SECONDS = 300
+
+
+def apply_increments(increments):
+    """Ghi các lượt xem {product_id: n} xuống CSDL, gom theo giá trị n"""
+    from .models import Product
+
+    by_amount = defaultdict(list)
+    for product_id, amount in increments.items():
+        if amount > 0:
+            by_amount[amount].append(product_id)
+    with transaction.atomic():
+        for amount, product_ids in by_amount.items():
+            Product.objects.filter(pk__in=product_ids).update(views_count=F('views_count') + amount)
+    return sum(increments.values())
+
+
+class LocalViewBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, product_id, amount=1):
+        with self._lock:
+            self._counts[product_id] += amount
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+        try:
+            return apply_increments(counts)
+        except Exception:
+            # Trả lại bộ đệm để lần xả sau thử lại
+            with self._lock:
+                self._counts.update(counts)
+            raise
+
+
+class RedisViewBuffer:
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def record(self, product_id, amount=1):
+        import redis
+
+        try:
+            self._redis.hincrby(PENDING_KEY, product_id, amount)
+        except redis.RedisError:
+            # Lượt xem không quan trọng bằng trang sản phẩm: bỏ qua khi Redis lỗi
+            logger.warning('Không thể ghi lượt xem sản phẩm %s vào Redis', product_id)
+
+    def _claim(self, source):
+        """RENAME source sang một khóa mới của worker này; None nếu khóa đã bị nhận"""
+        import redis
+
+        key = f'{PROCESSING_PREFIX}{int(time.time())}:{uuid.uuid4().hex}'
+        try:
+            self._redis.rename(source, key)
+        except redis.ResponseError:
+            return None
+        return key
+
+    def _orphans(self):
+        cutoff = time.time() - PROCESSING_LEASE_SECONDS
+        for key in self._redis.scan_iter(f'{PROCESSING_PREFIX}*'):
+            key = key.decode()
+            claimed_at = key[len(PROCESSING_PREFIX):].split(':', 1)[0]
+            if claimed_at.isdigit() and int(claimed_at) < cutoff:
+                yield key
+
+    def flush(self):
+        keys = [self._claim(key) for key in self._orphans()]
+        keys.append(self._claim(PENDING_KEY))
+
+        total = 0
+        for key in filter(None, keys):
+            increments = {
+                int(product_id): int(amount)
+                for product_id, amount in self._redis.hgetall(key).items()
+            }
+            total += apply_increments(increments)
+            self._redis.delete(key)
+        return total
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flusher = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if settings.VIEW_COUNTER_BACKEND == 'redis':
+                    _buffer = RedisViewBuffer(settings.REDIS_URL)
+                else:
+                    _buffer = LocalViewBuffer()
+                    atexit.register(_flush_quietly)
+    return _buffer
+
+
+def _flush_quietly():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Không thể ghi lượt xem sản phẩm xuống CSDL')
+    finally:
+        close_old_connections()
+
+
+def _run_flusher(interval):
+    while True:
+        time.sleep(interval)
+        _flush_quietly()
+
+
+def _ensure_flusher():
+    global _flusher
+    interval = settings.VIEW_COUNTER_FLUSH_INTERVAL
+    if _flusher is None and interval:
+        with _buffer_lock:
+            if _flusher is None:
+                _flusher = threading.Thread(
+                    target=_run_flusher, args=(interval,), name='view-counter-flusher', daemon=True
+                )
+                _flusher.start()
+
+
+def record_view(product_id):
+    """Ghi nhận một lượt xem (không truy vấn CSDL)"""
+    get_buffer().record(product_id)
+    _ensure_flusher()
+
+
+def flush():
+    """Xả bộ đệm xuống CSDL, trả về tổng số lượt xem đã ghi"""
+    return get_buffer().flush()
@@ -1,27 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Avg
+from django.db.models import Q
 from django.http import JsonResponse
 
 from .models import Product, Category, Review
 from .forms import ProductSearchForm, ReviewForm
+from . import home_cache
+from .facets import compute_facets, rating_band_q
+from .pagination import SORT_ORDERINGS, paginate_products
+from .search import search_products
+from .autocomplete import suggest
+from .view_counter import record_view
 
 
 def home_view(request):
-    """Trang chủ"""
-    featured_products = Product.objects.filter(is_active=True, is_featured=True)[:8]
-    new_products = Product.objects.filter(is_active=True).order_by('-created_at')[:8]
-    categories = Category.objects.filter(is_active=True)[:6]
-    best_sellers = Product.objects.filter(is_active=True).order_by('-sold_count')[:4]
-    
-    context = {
-        'featured_products': featured_products,
-        'new_products': new_products,
-        'categories': categories,
-        'best_sellers': best_sellers,
-    }
+    """Trang chủ (các khối sản phẩm được cache, xem home_cache.py)"""
+    context = home_cache.get_sections(request)
     return render(request, 'home.html', context)
 
 
@@ -29,52 +24,60 @@ def product_list_view(request):
     """Danh sách sản phẩm với tìm kiếm và lọc"""
     products = Product.objects.filter(is_active=True)
     form = ProductSearchForm(request.GET)
+    category_products = products
+    price_products = None
+    sort = ''
     
     if form.is_valid():
-        # Tìm kiếm theo từ khóa
+        # Tìm kiếm theo từ khóa (sắp xếp theo độ liên quan)
         q = form.cleaned_data.get('q')
         if q:
-            products = products.filter(
-                Q(name__icontains=q) | 
-                Q(description__icontains=q) |
-                Q(category__name__icontains=q)
-            )
+            products = search_products(products, q)
         
-        # Lọc theo danh mục
-        category = form.cleaned_data.get('category')
-        if category:
-            products = products.filter(category=category)
-        
-        # Lọc theo giá
+        # Lọc theo giá (áp dụng sau cùng; khi có lọc giá, facet khoảng giá đếm trên tập chưa lọc giá)
+        price_q = Q()
         min_price = form.cleaned_data.get('min_price')
         max_price = form.cleaned_data.get('max_price')
         if min_price:
-            products = products.filter(price__gte=min_price)
+            price_q &= Q(price__gte=min_price)
         if max_price:
-            products = products.filter(price__lte=max_price)
+            price_q &= Q(price__lte=max_price)
+        
+        # Lọc theo đánh giá, tồn kho, khuyến mãi
+        min_rating = form.cleaned_data.get('min_rating')
+        if min_rating:
+            products = products.filter(rating_band_q(min_rating))
+        if form.cleaned_data.get('in_stock'):
+            products = products.filter(stock__gt=0)
+        if form.cleaned_data.get('on_sale'):
+            products = products.filter(sale_price__isnull=False)
+        
+        # Lọc theo danh mục (facet danh mục đếm trên tập chưa lọc danh mục)
+        category_products = products.filter(price_q)
+        category = form.cleaned_data.get('category')
+        if category:
+            products = products.filter(category=category)
+        if price_q:
+            price_products = products
+            products = products.filter(price_q)
         
         # Sắp xếp
-        sort = form.cleaned_data.get('sort')
-        if sort == 'price_asc':
-            products = products.order_by('price')
-        elif sort == 'price_desc':
-            products = products.order_by('-price')
-        elif sort == 'name':
-            products = products.order_by('name')
-        elif sort == 'best_seller':
-            products = products.order_by('-sold_count')
+        sort = form.cleaned_data.get('sort') or ''
+        if sort:
+            products = products.order_by(*SORT_ORDERINGS[sort])
     
-    # Phân trang
-    paginator = Paginator(products, 12)
-    page = request.GET.get('page')
-    products = paginator.get_page(page)
+    # Số lượng theo danh mục, khoảng giá, đánh giá, tồn kho, khuyến mãi
+    facets = compute_facets(products, category_products, price_products)
     
-    categories = Category.objects.filter(is_active=True)
+    # Phân trang
+    products = paginate_products(request, products, sort=sort, count=facets['total'])
     
     context = {
         'products': products,
         'form': form,
-        'categories': categories,
+        # Danh mục có sản phẩm trong kết quả, kèm số lượng (dict id/name/slug/count)
+        'categories': facets['categories'],
+        'facets': facets,
     }
     return render(request, 'products/product_list.html', context)
 
@@ -83,9 +86,8 @@ def product_detail_view(request, slug):
     """Chi tiết sản phẩm với bình luận"""
     product = get_object_or_404(Product, slug=slug, is_active=True)
     
-    # Tăng lượt xem
-    product.views_count += 1
-    product.save(update_fields=['views_count'])
+    # Tăng lượt xem (ghi vào bộ đệm, xả xuống CSDL theo lô)
+    record_view(product.id)
     
     # Lấy đánh giá
     reviews = product.reviews.filter(is_approved=True).order_by('-created_at')
@@ -139,10 +141,7 @@ def products_by_category_view(request, slug):
     """Sản phẩm theo danh mục"""
     category = get_object_or_404(Category, slug=slug, is_active=True)
     products = Product.objects.filter(category=category, is_active=True)
-    
-    paginator = Paginator(products, 12)
-    page = request.GET.get('page')
-    products = paginator.get_page(page)
+    products = paginate_products(request, products)
     
     context = {
         'category': category,
@@ -157,17 +156,4 @@ def search_products_api(request):
     if len(q) < 2:
         return JsonResponse({'results': []})
     
-    products = Product.objects.filter(
-        Q(name__icontains=q) | Q(description__icontains=q),
-        is_active=True
-    )[:10]
-    
-    results = [{
-        'id': p.id,
-        'name': p.name,
-        'price': str(p.final_price),
-        'image': p.image.url if p.image else '',
-        'url': p.get_absolute_url(),
-    } for p in products]
-    
-    return JsonResponse({'results': results})
\ No newline at end of file
+    return JsonResponse({'results': suggest(q, limit=10)})
\ No newline at end of file